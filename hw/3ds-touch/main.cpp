@@ -33,6 +33,21 @@ const uint8_t PARSE_MASK = PARSE_HIGH - 1;
 const uint16_t X_MAX = 319;
 const uint16_t Y_MAX = 239;
 
+// 'p' <n> (<x high> <x low> <y> <ms low> <ms high>) * n
+//
+// touches each point for <ms> in turn without releasing in between (a drag).
+// an <x high> of PATH_LIFT releases for <ms> instead.  the whole path is read
+// before it is played (it would not fit in the serial receive buffer) so at
+// most PATH_MAX_POINTS points are allowed, longer paths are ignored.
+const uint8_t PATH_LIFT = 0xff;
+#define PATH_MAX_POINTS 64
+
+typedef struct {
+    uint16_t x;
+    uint8_t y;
+    uint16_t ms;
+} Point_t;
+
 void voltage(uint8_t addr, uint16_t f, bool store = false) {
     uint8_t data[3];
     data[0] = store ? 0x60 : 0x40;
@@ -43,6 +58,37 @@ void voltage(uint8_t addr, uint16_t f, bool store = false) {
     Wire.endTransmission();
 }
 
+uint8_t serial_read_blocking() {
+    while (!Serial.available());
+    return Serial.read();
+}
+
+void touch_hold(uint16_t x, uint16_t y, uint32_t ms) {
+    uint16_t x_voltage = ((float)min(x, X_MAX) / X_MAX) * SCALE_X;
+    uint16_t y_voltage = ((float)min(y, Y_MAX) / Y_MAX) * SCALE_Y;
+
+    voltage(DAC_X, x_voltage);
+    voltage(DAC_Y, 0);
+
+    uint32_t end = millis() + ms;
+    while (millis() < end) {
+        // wait until X is read (Y+ high)
+        while (analogRead(PIN_Y_READ) < 300);
+        // then delay until Y will be read
+        delayMicroseconds(355);
+        // write our Y value
+        voltage(DAC_Y, y_voltage);
+        delayMicroseconds(20);
+        // continue touching
+        voltage(DAC_Y, 0);
+    }
+}
+
+void touch_release() {
+    voltage(DAC_Y, SCALE_Y);
+    voltage(DAC_X, 0);
+}
+
 int main() {
     init();
 
@@ -77,6 +123,7 @@ int main() {
     int c = '.';
     uint16_t x = 0;
     uint16_t y = 0;
+    Point_t path[PATH_MAX_POINTS];
 
     while (true) {
         if (Serial.available()) {
@@ -109,27 +156,34 @@ int main() {
 
             c = '.';
         } else if (c == 't') {
-            uint16_t x_voltage = ((float)x / X_MAX) * SCALE_X;
-            uint16_t y_voltage = ((float)y / Y_MAX) * SCALE_Y;
-
-            voltage(DAC_X, x_voltage);
-            voltage(DAC_Y, 0);
-
-            uint32_t end = millis() + 300;
-            while (millis() < end) {
-                // wait until X is read (Y+ high)
-                while (analogRead(PIN_Y_READ) < 300);
-                // then delay until Y will be read
-                delayMicroseconds(355);
-                // write our Y value
-                voltage(DAC_Y, y_voltage);
-                delayMicroseconds(20);
-                // continue touching
-                voltage(DAC_Y, 0);
+            touch_hold(x, y, 300);
+            touch_release();
+
+            c = '.';
+        } else if (c == 'p') {
+            uint8_t n = serial_read_blocking();
+            // always consume the whole packet so the stream stays in sync
+            for (uint8_t i = 0; i < n; i += 1) {
+                Point_t point;
+                point.x = serial_read_blocking() << 8;
+                point.x |= serial_read_blocking();
+                point.y = serial_read_blocking();
+                point.ms = serial_read_blocking();
+                point.ms |= serial_read_blocking() << 8;
+                if (i < PATH_MAX_POINTS) {
+                    path[i] = point;
+                }
             }
 
-            voltage(DAC_Y, SCALE_Y);
-            voltage(DAC_X, 0);
+            for (uint8_t i = 0; n <= PATH_MAX_POINTS && i < n; i += 1) {
+                if (path[i].x >> 8 == PATH_LIFT) {
+                    touch_release();
+                    delay(path[i].ms);
+                } else {
+                    touch_hold(path[i].x, path[i].y, path[i].ms);
+                }
+            }
+            touch_release();
 
             c = '.';
         }
@@ -0,0 +1,48 @@
+#ifndef _MACRO_H
+#define _MACRO_H
+
+#include <stdint.h>
+
+// a macro is sent as:
+//
+//   'M' <n> (<command> <ms low byte> <ms high byte>) * n
+//
+// each step applies <command> (exactly like the single byte command) and then
+// holds it for <ms> milliseconds.  a <command> of MACRO_HOLD keeps the
+// current report.
+
+#define MACRO_MAX_STEPS 64
+#define MACRO_HOLD 0
+
+typedef struct {
+    uint8_t c;
+    uint16_t ms;
+} Step_t;
+
+typedef struct {
+    uint8_t n;
+    Step_t steps[MACRO_MAX_STEPS];
+} Macro_t;
+
+// read the remainder of a macro packet (after the 'M') using `read` which
+// returns one byte at a time.  returns false if the packet is invalid.
+template <typename Read>
+bool macro_read(Macro_t* macro, Read read) {
+    uint8_t n = read();
+
+    // always consume the whole packet so the stream stays in sync
+    for (uint8_t i = 0; i < n; i += 1) {
+        Step_t step;
+        step.c = read();
+        step.ms = read();
+        step.ms |= read() << 8;
+        if (i < MACRO_MAX_STEPS) {
+            macro->steps[i] = step;
+        }
+    }
+
+    macro->n = n <= MACRO_MAX_STEPS ? n : 0;
+    return n <= MACRO_MAX_STEPS;
+}
+
+#endif
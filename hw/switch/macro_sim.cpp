@@ -0,0 +1,68 @@
+// host build of the firmware's command parsing, for testing without a board
+//
+//     make macro_sim
+//     printf 'M\x02A\x64\x00\x30\x4b\x00' | ./macro_sim
+//
+// prints each report which would be sent along with the (simulated) time
+#include <stdio.h>
+#include <stdlib.h>
+
+#include "report.h"
+#include "macro.h"
+
+static uint8_t read_stdin() {
+    int c = getchar();
+    if (c == EOF) {
+        fprintf(stderr, "unexpected end of input\n");
+        exit(1);
+    }
+    return c;
+}
+
+static void print_report(uint32_t t, uint8_t c, Report_t report) {
+    printf(
+        "t=%lu c=%c button=0x%04x dpad=%d lx=%d ly=%d rx=%d ry=%d\n",
+        (unsigned long)t, c, report.button, report.dpad,
+        report.lx, report.ly, report.rx, report.ry
+    );
+}
+
+static void print_command(uint32_t t, uint8_t c, uint8_t x, uint8_t y) {
+    Report_t report;
+    make_report(&report, c, x, y);
+    print_report(t, c, report);
+}
+
+int main() {
+    Macro_t macro;
+    uint32_t t = 0;
+    int read;
+    while ((read = getchar()) != EOF) {
+        if (read == 'V' || read == 'v') {
+            continue;
+        } else if (read == 'M') {
+            if (!macro_read(&macro, read_stdin)) {
+                printf("macro too long!\n");
+                continue;
+            }
+            for (uint8_t i = 0; i < macro.n; i += 1) {
+                if (macro.steps[i].c != MACRO_HOLD) {
+                    print_command(t, macro.steps[i].c, 0, 0);
+                }
+                t += macro.steps[i].ms;
+            }
+        } else if (read == '<' || read == '>') {
+            uint8_t x = read_stdin();
+            uint8_t y = read_stdin();
+            print_command(t, read, x, y);
+        } else if (read == 'S') {
+            Report_t report;
+            state_read(&report, read_stdin);
+            print_report(t, read, report);
+        } else {
+            print_command(t, read, 0, 0);
+        }
+    }
+    printf("t=%lu end\n", (unsigned long)t);
+    return 0;
+}
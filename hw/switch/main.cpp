@@ -1,6 +1,10 @@
 #include <Arduino.h>
 #include <HID.h>
 
+#include "report.h"
+#include "macro.h"
+#include "protocol.h"
+
 static const uint8_t _desc_data[] PROGMEM = {
     0x05, 0x01,
     0x09, 0x05,
@@ -62,232 +66,59 @@ class HIDWithoutReportID : public HID_ {
         }
 };
 
-typedef enum {
-    BUTTON_Y       = 0x01,
-    BUTTON_B       = 0x02,
-    BUTTON_A       = 0x04,
-    BUTTON_X       = 0x08,
-    BUTTON_L       = 0x10,
-    BUTTON_R       = 0x20,
-    BUTTON_ZL      = 0x40,
-    BUTTON_ZR      = 0x80,
-    BUTTON_MINUS   = 0x100,
-    BUTTON_PLUS    = 0x200,
-    BUTTON_LCLICK  = 0x400,
-    BUTTON_RCLICK  = 0x800,
-    BUTTON_HOME    = 0x1000,
-    BUTTON_CAPTURE = 0x2000,
-} Buttons_t;
-
-#define DPAD_TOP          0x00
-#define DPAD_TOP_RIGHT    0x01
-#define DPAD_RIGHT        0x02
-#define DPAD_BOTTOM_RIGHT 0x03
-#define DPAD_BOTTOM       0x04
-#define DPAD_BOTTOM_LEFT  0x05
-#define DPAD_LEFT         0x06
-#define DPAD_TOP_LEFT     0x07
-#define DPAD_CENTER       0x08
-
-#define STICK_MIN      0
-#define STICK_CENTER 128
-#define STICK_MAX    255
-
-typedef struct {
-    uint16_t button;
-    uint8_t dpad;
-    uint8_t lx;
-    uint8_t ly;
-    uint8_t rx;
-    uint8_t ry;
-    uint8_t _unused;
-} Report_t;
-
 const int PIN_BUZZER = 9;
 
-void make_report(Report_t* report, uint8_t c, uint8_t x, uint8_t y) {
-    memset(report, 0, sizeof(Report_t));
-
-    report->lx = report->ly = STICK_CENTER;
-    report->rx = report->ry = STICK_CENTER;
-    report->dpad = DPAD_CENTER;
-
-    switch (c) {
-        case 'A':
-            report->button |= BUTTON_A;
-            break;
-
-        case 'B':
-            report->button |= BUTTON_B;
-            break;
-
-        case 'X':
-            report->button |= BUTTON_X;
-            break;
-
-        case 'Y':
-            report->button |= BUTTON_Y;
-            break;
-
-        case 'H':
-            report->button |= BUTTON_HOME;
-            break;
-
-        case '+':
-            report->button |= BUTTON_PLUS;
-            break;
-
-        case '-':
-            report->button |= BUTTON_MINUS;
-            break;
-
-        case 'L':
-            report->button |= BUTTON_L;
-            break;
-
-        case 'R':
-            report->button |= BUTTON_R;
-            break;
-
-        case 'l':
-            report->button |= BUTTON_ZL;
-            break;
-
-        case 'r':
-            report->button |= BUTTON_ZR;
-            break;
-
-        case 'w':
-            report->ly = STICK_MIN;
-            break;
-
-        case 'a':
-            report->lx = STICK_MIN;
-            break;
-
-        case 's':
-            report->ly = STICK_MAX;
-            break;
-
-        case 'd':
-            report->lx = STICK_MAX;
-            break;
-
-        case 'q':
-            report->ly = STICK_MIN;
-            report->lx = STICK_MIN;
-            break;
-
-        case 'e':
-            report->ly = STICK_MIN;
-            report->lx = STICK_MAX;
-            break;
-
-        case 'z':
-            report->ly = STICK_MAX;
-            report->lx = STICK_MIN;
-            break;
-
-        case 'c':
-            report->ly = STICK_MAX;
-            report->lx = STICK_MAX;
-            break;
-
-        case 'u':
-            report->ry = STICK_MIN;
-            break;
-
-        case 'h':
-            report->rx = STICK_MIN;
-            break;
-
-        case 'j':
-            report->ry = STICK_MAX;
-            break;
-
-        case 'k':
-            report->rx = STICK_MAX;
-            break;
-
-        case 'y':
-            report->ry = STICK_MIN;
-            report->rx = STICK_MIN;
-            break;
-
-        case 'i':
-            report->ry = STICK_MIN;
-            report->rx = STICK_MAX;
-            break;
-
-        case 'n':
-            report->ry = STICK_MAX;
-            report->rx = STICK_MIN;
-            break;
-
-        case 'm':
-            report->ry = STICK_MAX;
-            report->rx = STICK_MAX;
-            break;
-
-        case '~':
-            report->button |= BUTTON_L | BUTTON_R;
-            break;
-
-        case '@':
-            report->button |= BUTTON_A;
-            report->ly = STICK_MAX;
-            break;
-
-        case '#':
-            report->lx = STICK_MIN;
-            report->rx = STICK_MIN;
-            break;
-
-        case '$':
-            report->lx = (STICK_MAX - STICK_MIN) * 3 / 5;
-            report->ly = (STICK_MAX - STICK_MIN) * 3 / 5;
-            break;
-
-        case '{':
-            report->button = BUTTON_LCLICK;
-            break;
-        case '}':
-            report->button = BUTTON_RCLICK;
-            break;
-
-        case '<':
-            report->lx = x;
-            report->ly = y;
-            break;
-        case '>':
-            report->rx = x;
-            report->ry = y;
-            break;
-
-        case 'C':
-            report->button = BUTTON_CAPTURE;
-            break;
-
-        case '1':
-            report->dpad = DPAD_RIGHT;
-            break;
-        case '2':
-            report->dpad = DPAD_BOTTOM;
-            break;
-        case '3':
-            report->dpad = DPAD_LEFT;
-            break;
-        case '4':
-            report->dpad = DPAD_TOP;
-            break;
-    }
-}
-
 uint8_t serial_read_blocking() {
     while (!Serial1.available());
     return Serial1.read();
 }
 
+void serial_write(uint8_t c) {
+    Serial1.write(c);
+}
+
+class Controller {
+    public:
+        Controller(HIDWithoutReportID& hid) : hid(hid) {}
+
+        void apply(uint8_t c, uint8_t x, uint8_t y) {
+            digitalWrite(PIN_BUZZER, c == '!' ? HIGH : LOW);
+
+            make_report(&report, c, x, y);
+            hid.send_report(&report, sizeof(Report_t));
+        }
+
+        template <typename Read>
+        void apply_state(Read read) {
+            digitalWrite(PIN_BUZZER, LOW);
+
+            state_read(&report, read);
+            hid.send_report(&report, sizeof(Report_t));
+        }
+
+        // returns early (leaving the current report) once `stop` is true
+        template <typename Stop>
+        void play(Macro_t* macro, Stop stop) {
+            for (uint8_t i = 0; i < macro->n; i += 1) {
+                Step_t* step = &macro->steps[i];
+                if (step->c != MACRO_HOLD) {
+                    apply(step->c, 0, 0);
+                }
+
+                uint32_t start = millis();
+                while (millis() - start < step->ms) {
+                    if (stop()) {
+                        return;
+                    }
+                }
+            }
+        }
+
+    private:
+        HIDWithoutReportID& hid;
+        Report_t report;
+};
+
 int main() {
     init();
 
@@ -301,13 +132,105 @@ int main() {
 
     pinMode(PIN_BUZZER, OUTPUT);
 
-    Report_t report;
+    Controller controller(hid);
+    Macro_t macro;
+    Frame_t frame;
+    bool have_frame = false;
+    uint32_t received = 0;
+    bool framed = false;
+    bool timing = false;
+    uint8_t last_seq = PROTOCOL_NO_SEQ;
     bool verbose = false;
     uint8_t c = '.';
     uint8_t x = 0;
     uint8_t y = 0;
     while (true) {
-        if (Serial1.available()) {
+        if (framed && (have_frame || Serial1.available())) {
+            if (have_frame) {  // arrived while a macro was playing
+                have_frame = false;
+            } else if (!frame_read(&frame, serial_read_blocking)) {
+                frame_write(frame.seq, PROTOCOL_NAK, serial_write);
+                continue;
+            } else {
+                received = micros();
+            }
+            frame_write(frame.seq, PROTOCOL_ACK, serial_write);
+            if (frame.seq == last_seq) {
+                continue;
+            }
+            last_seq = frame.seq;
+
+            if (frame.c == PROTOCOL_PING) {
+                continue;
+            } else if (frame.c == PROTOCOL_LEGACY) {
+                Serial1.flush();
+                Serial1.begin(9600);
+                framed = false;
+                timing = false;
+                last_seq = PROTOCOL_NO_SEQ;
+                continue;
+            } else if (frame.c == PROTOCOL_TIMING) {
+                timing = frame.len == 1 && frame.payload[0];
+                continue;
+            }
+
+            uint8_t i = 0;
+            auto read = [&]() -> uint8_t {
+                return i < frame.len ? frame.payload[i++] : 0;
+            };
+            if (frame.c == 'M') {
+                if (macro_read(&macro, read)) {
+                    uint8_t seq = frame.seq;
+                    controller.play(&macro, [&]() -> bool {
+                        if (!Serial1.available()) {
+                            return false;
+                        } else if (!frame_read(&frame, serial_read_blocking)) {
+                            frame_write(frame.seq, PROTOCOL_NAK, serial_write);
+                            return false;
+                        } else if (frame.seq == seq) {
+                            // the host retransmits the macro if our ack was
+                            // lost, that must not cut it short
+                            frame_write(seq, PROTOCOL_ACK, serial_write);
+                            return false;
+                        } else {
+                            received = micros();
+                            have_frame = true;
+                            return true;
+                        }
+                    });
+                }
+                continue;
+            } else if (frame.c == 'S') {
+                if (frame.len != STATE_SIZE) {
+                    continue;
+                }
+                controller.apply_state(read);
+            } else if (frame.c == '<' || frame.c == '>') {
+                if (frame.len != 2) {
+                    continue;
+                }
+                c = frame.c;
+                x = frame.payload[0];
+                y = frame.payload[1];
+                controller.apply(c, x, y);
+            } else {
+                c = frame.c;
+                controller.apply(c, x, y);
+            }
+
+            if (timing) {
+                uint8_t payload[8];
+                write_u32(payload, received);
+                write_u32(payload + 4, micros());
+                frame_write(
+                    frame.seq,
+                    PROTOCOL_TIMING,
+                    serial_write,
+                    payload,
+                    sizeof(payload)
+                );
+            }
+        } else if (Serial1.available()) {
             char read = Serial1.read();
             if (read == 'V') {
                 verbose = true;
@@ -315,6 +238,29 @@ int main() {
             } else if (read == 'v') {
                 verbose = false;
                 Serial1.println("disabling verbose mode");
+            } else if (read == 'P') {
+                uint8_t version = serial_read_blocking();
+                Serial1.write('P');
+                Serial1.write(PROTOCOL_VERSION);
+                if (version == PROTOCOL_VERSION) {
+                    Serial1.flush();
+                    Serial1.begin(PROTOCOL_BAUD);
+                    framed = true;
+                    last_seq = PROTOCOL_NO_SEQ;
+                }
+                continue;
+            } else if (read == 'M') {
+                if (macro_read(&macro, serial_read_blocking)) {
+                    controller.play(&macro, []() -> bool {
+                        return Serial1.available();
+                    });
+                } else {
+                    Serial1.println("macro too long!");
+                }
+                continue;
+            } else if (read == 'S') {
+                controller.apply_state(serial_read_blocking);
+                continue;
             } else if (read == '<' || read == '>') {
                 c = read;
                 x = serial_read_blocking();
@@ -328,10 +274,7 @@ int main() {
                 }
             }
 
-            digitalWrite(PIN_BUZZER, c == '!' ? HIGH : LOW);
-
-            make_report(&report, c, x, y);
-            hid.send_report(&report, sizeof(Report_t));
+            controller.apply(c, x, y);
         }
     }
 }
@@ -0,0 +1,98 @@
+#ifndef _PROTOCOL_H
+#define _PROTOCOL_H
+
+#include <stdint.h>
+
+// the legacy protocol is single ascii command bytes at 9600 baud.  sending
+//
+//   'P' <version>
+//
+// replies 'P' PROTOCOL_VERSION and, if the versions match, switches to framed
+// messages at PROTOCOL_BAUD:
+//
+//   PROTOCOL_SYNC <len> <seq> <command> <payload> * len <checksum>
+//
+// <checksum> is the xor of every byte after PROTOCOL_SYNC.  every frame is
+// answered with a PROTOCOL_ACK frame (PROTOCOL_NAK if it was corrupt) with
+// the same <seq>.  a repeated <seq> is acknowledged but not run again.  the
+// host numbers commands from 1 and skips 0 when wrapping around: switching
+// protocols resets the last <seq> to 0 so the first frame of the next session
+// always runs (a host reconnecting to firmware which is still framed sends a
+// PROTOCOL_PING with <seq> 0 for the same effect).
+//
+// a frame received while an 'M' macro plays stops the macro, except for a
+// repeat of the macro's own frame (its ack was lost) which is only
+// acknowledged.
+//
+// after PROTOCOL_TIMING with a payload of 1, every command frame which sends
+// a report (every valid command other than 'M', even when the report is
+// unchanged) is additionally answered with a PROTOCOL_TIMING frame (same
+// <seq>) whose payload is two little endian uint32 `micros()` timestamps: when
+// the frame was received and when the report was sent.  a payload of 0
+// disables this again.
+
+#define PROTOCOL_VERSION 1
+#define PROTOCOL_BAUD 250000
+#define PROTOCOL_SYNC 0xa5
+// never the <seq> of a command
+#define PROTOCOL_NO_SEQ 0
+#define PROTOCOL_ACK 'a'
+#define PROTOCOL_NAK 'n'
+// does nothing (other than being acknowledged)
+#define PROTOCOL_PING 'P'
+// return to the legacy protocol at 9600 baud
+#define PROTOCOL_LEGACY 'p'
+#define PROTOCOL_TIMING 'T'
+
+typedef struct {
+    uint8_t len;
+    uint8_t seq;
+    uint8_t c;
+    uint8_t payload[255];
+} Frame_t;
+
+// read the next frame using `read` which returns one byte at a time.
+// returns false if the checksum does not match.
+template <typename Read>
+bool frame_read(Frame_t* frame, Read read) {
+    while (read() != PROTOCOL_SYNC);
+
+    frame->len = read();
+    frame->seq = read();
+    frame->c = read();
+    uint8_t checksum = frame->len ^ frame->seq ^ frame->c;
+    for (uint8_t i = 0; i < frame->len; i += 1) {
+        frame->payload[i] = read();
+        checksum ^= frame->payload[i];
+    }
+
+    return read() == checksum;
+}
+
+template <typename Write>
+void frame_write(
+        uint8_t seq,
+        uint8_t c,
+        Write write,
+        const uint8_t* payload = 0,
+        uint8_t len = 0
+) {
+    uint8_t checksum = len ^ seq ^ c;
+    write(PROTOCOL_SYNC);
+    write(len);
+    write(seq);
+    write(c);
+    for (uint8_t i = 0; i < len; i += 1) {
+        write(payload[i]);
+        checksum ^= payload[i];
+    }
+    write(checksum);
+}
+
+void write_u32(uint8_t* dest, uint32_t n) {
+    for (uint8_t i = 0; i < 4; i += 1) {
+        dest[i] = n >> (8 * i);
+    }
+}
+
+#endif
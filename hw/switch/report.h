@@ -0,0 +1,244 @@
+#ifndef _REPORT_H
+#define _REPORT_H
+
+#include <stdint.h>
+#include <string.h>
+
+typedef enum {
+    BUTTON_Y       = 0x01,
+    BUTTON_B       = 0x02,
+    BUTTON_A       = 0x04,
+    BUTTON_X       = 0x08,
+    BUTTON_L       = 0x10,
+    BUTTON_R       = 0x20,
+    BUTTON_ZL      = 0x40,
+    BUTTON_ZR      = 0x80,
+    BUTTON_MINUS   = 0x100,
+    BUTTON_PLUS    = 0x200,
+    BUTTON_LCLICK  = 0x400,
+    BUTTON_RCLICK  = 0x800,
+    BUTTON_HOME    = 0x1000,
+    BUTTON_CAPTURE = 0x2000,
+} Buttons_t;
+
+#define DPAD_TOP          0x00
+#define DPAD_TOP_RIGHT    0x01
+#define DPAD_RIGHT        0x02
+#define DPAD_BOTTOM_RIGHT 0x03
+#define DPAD_BOTTOM       0x04
+#define DPAD_BOTTOM_LEFT  0x05
+#define DPAD_LEFT         0x06
+#define DPAD_TOP_LEFT     0x07
+#define DPAD_CENTER       0x08
+
+#define STICK_MIN      0
+#define STICK_CENTER 128
+#define STICK_MAX    255
+
+typedef struct {
+    uint16_t button;
+    uint8_t dpad;
+    uint8_t lx;
+    uint8_t ly;
+    uint8_t rx;
+    uint8_t ry;
+    uint8_t _unused;
+} Report_t;
+
+void make_report(Report_t* report, uint8_t c, uint8_t x, uint8_t y) {
+    memset(report, 0, sizeof(Report_t));
+
+    report->lx = report->ly = STICK_CENTER;
+    report->rx = report->ry = STICK_CENTER;
+    report->dpad = DPAD_CENTER;
+
+    switch (c) {
+        case 'A':
+            report->button |= BUTTON_A;
+            break;
+
+        case 'B':
+            report->button |= BUTTON_B;
+            break;
+
+        case 'X':
+            report->button |= BUTTON_X;
+            break;
+
+        case 'Y':
+            report->button |= BUTTON_Y;
+            break;
+
+        case 'H':
+            report->button |= BUTTON_HOME;
+            break;
+
+        case '+':
+            report->button |= BUTTON_PLUS;
+            break;
+
+        case '-':
+            report->button |= BUTTON_MINUS;
+            break;
+
+        case 'L':
+            report->button |= BUTTON_L;
+            break;
+
+        case 'R':
+            report->button |= BUTTON_R;
+            break;
+
+        case 'l':
+            report->button |= BUTTON_ZL;
+            break;
+
+        case 'r':
+            report->button |= BUTTON_ZR;
+            break;
+
+        case 'w':
+            report->ly = STICK_MIN;
+            break;
+
+        case 'a':
+            report->lx = STICK_MIN;
+            break;
+
+        case 's':
+            report->ly = STICK_MAX;
+            break;
+
+        case 'd':
+            report->lx = STICK_MAX;
+            break;
+
+        case 'q':
+            report->ly = STICK_MIN;
+            report->lx = STICK_MIN;
+            break;
+
+        case 'e':
+            report->ly = STICK_MIN;
+            report->lx = STICK_MAX;
+            break;
+
+        case 'z':
+            report->ly = STICK_MAX;
+            report->lx = STICK_MIN;
+            break;
+
+        case 'c':
+            report->ly = STICK_MAX;
+            report->lx = STICK_MAX;
+            break;
+
+        case 'u':
+            report->ry = STICK_MIN;
+            break;
+
+        case 'h':
+            report->rx = STICK_MIN;
+            break;
+
+        case 'j':
+            report->ry = STICK_MAX;
+            break;
+
+        case 'k':
+            report->rx = STICK_MAX;
+            break;
+
+        case 'y':
+            report->ry = STICK_MIN;
+            report->rx = STICK_MIN;
+            break;
+
+        case 'i':
+            report->ry = STICK_MIN;
+            report->rx = STICK_MAX;
+            break;
+
+        case 'n':
+            report->ry = STICK_MAX;
+            report->rx = STICK_MIN;
+            break;
+
+        case 'm':
+            report->ry = STICK_MAX;
+            report->rx = STICK_MAX;
+            break;
+
+        case '~':
+            report->button |= BUTTON_L | BUTTON_R;
+            break;
+
+        case '@':
+            report->button |= BUTTON_A;
+            report->ly = STICK_MAX;
+            break;
+
+        case '#':
+            report->lx = STICK_MIN;
+            report->rx = STICK_MIN;
+            break;
+
+        case '$':
+            report->lx = (STICK_MAX - STICK_MIN) * 3 / 5;
+            report->ly = (STICK_MAX - STICK_MIN) * 3 / 5;
+            break;
+
+        case '{':
+            report->button = BUTTON_LCLICK;
+            break;
+        case '}':
+            report->button = BUTTON_RCLICK;
+            break;
+
+        case '<':
+            report->lx = x;
+            report->ly = y;
+            break;
+        case '>':
+            report->rx = x;
+            report->ry = y;
+            break;
+
+        case 'C':
+            report->button = BUTTON_CAPTURE;
+            break;
+
+        case '1':
+            report->dpad = DPAD_RIGHT;
+            break;
+        case '2':
+            report->dpad = DPAD_BOTTOM;
+            break;
+        case '3':
+            report->dpad = DPAD_LEFT;
+            break;
+        case '4':
+            report->dpad = DPAD_TOP;
+            break;
+    }
+}
+
+// the 'S' command sets the whole report at once:
+//
+//   'S' <button low byte> <button high byte> <dpad> <lx> <ly> <rx> <ry>
+#define STATE_SIZE 7
+
+template <typename Read>
+void state_read(Report_t* report, Read read) {
+    memset(report, 0, sizeof(Report_t));
+
+    report->button = read();
+    report->button |= read() << 8;
+    report->dpad = read();
+    report->lx = read();
+    report->ly = read();
+    report->rx = read();
+    report->ry = read();
+}
+
+#endif
@@ -1,13 +1,29 @@
 from typing import Any
 
 
+class SerialException(OSError): ...
+
+
 class Serial:
-    def __init__(self, p: str, d: int) -> None: ...
+    baudrate: int
+    timeout: float | None
+    def __init__(
+            self,
+            p: str,
+            d: int,
+            *,
+            timeout: float | None = ...,
+    ) -> None: ...
     def __enter__(self) -> Serial: ...
     def __exit__(self, *a: Any) -> bool | None: ...
     def write(self, bts: bytes) -> int: ...
     @property
     def in_waiting(self) -> bool: ...
-    def read(self) -> bytes: ...
+    @property
+    def is_open(self) -> bool: ...
+    def read(self, size: int = ...) -> bytes: ...
+    def reset_input_buffer(self) -> None: ...
+    def flush(self) -> None: ...
+    def close(self) -> None: ...
     @property
     def fd(self) -> int: ...
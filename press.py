@@ -1,27 +1,209 @@
+"""press a key, or play back an input script
+
+    python3 press.py A --count 5
+    python3 press.py --script rng.txt
+
+a script has one press per line: the key, how long to hold it and how long
+to wait after releasing it (both optional, in seconds or frames with an `f`
+suffix).  `wait` only waits and `repeat` blocks are repeated:
+
+    # comments are ignored
+    A .1 .05
+    repeat 10
+        B 3f 2f
+        wait .5
+    end
+
+input is queued on the scheduler's timeline (so timing errors do not
+accumulate) and the achieved timing is compared with the requested timing at
+the end.
+"""
 from __future__ import annotations
 
 import argparse
+import sys
 import time
+from collections.abc import Generator
+from collections.abc import Iterable
+from typing import NamedTuple
+from typing import Union
 
 import serial
 
+from scripts.engine import scheduler
+from scripts.engine import Transport
+from scripts.profiling import Timing
 from scripts.switch import SERIAL_DEFAULT
 
+LOOKAHEAD = .5
+
+
+class Step(NamedTuple):
+    key: bytes  # empty to only wait
+    hold: float
+    gap: float
+
+
+class Repeat(NamedTuple):
+    times: int
+    block: tuple[Item, ...]
+
+
+Item = Union[Step, Repeat]
+
+
+def _duration(s: str, *, fps: float) -> float:
+    if s.endswith('f'):
+        return float(s[:-1]) / fps
+    else:
+        return float(s)
+
+
+def parse(
+        lines: Iterable[str],
+        *,
+        hold: float,
+        gap: float,
+        fps: float,
+) -> tuple[Item, ...]:
+    stack: list[tuple[int, list[Item]]] = [(1, [])]
+    for lineno, line in enumerate(lines, start=1):
+        parts = line.split('#', 1)[0].split()
+        if not parts:
+            continue
+
+        try:
+            if parts[0] == 'repeat':
+                n, = parts[1:]
+                stack.append((int(n), []))
+            elif parts[0] == 'end':
+                if len(parts) != 1 or len(stack) == 1:
+                    raise ValueError('unexpected end')
+                repeat, block = stack.pop()
+                stack[-1][1].append(Repeat(repeat, tuple(block)))
+            elif parts[0] == 'wait':
+                duration, = parts[1:]
+                stack[-1][1].append(Step(b'', 0, _duration(duration, fps=fps)))
+            else:
+                key, *times = parts
+                if len(times) > 2:
+                    raise ValueError('expected: key [hold [gap]]')
+                durations = [_duration(s, fps=fps) for s in times]
+                durations += (hold, gap)[len(durations):]
+                stack[-1][1].append(Step(key.encode(), *durations))
+        except ValueError as e:
+            raise ValueError(f'line {lineno}: {line.strip()!r}: {e}')
+
+    if len(stack) != 1:
+        raise ValueError('missing end')
+    return tuple(stack[0][1])
+
+
+def steps(items: Iterable[Item]) -> Generator[Step, None, None]:
+    for item in items:
+        if isinstance(item, Repeat):
+            for _ in range(item.times):
+                yield from steps(item.block)
+        else:
+            yield item
+
+
+def play(
+        ser: serial.Serial,
+        items: Iterable[Item],
+        *,
+        release: bytes,
+) -> Timing:
+    """queue the input just ahead of time, returns the timing errors"""
+    sched = scheduler(ser)
+    sched.wait()
+
+    requested: list[float] = []
+    actual: list[float] = []
+
+    def listener(t: float, bts: bytes) -> None:
+        actual.append(t)
+
+    sched.listeners.append(listener)
+    try:
+        try:
+            t = 0.
+            for step in steps(items):
+                time.sleep(max(sched.remaining() - LOOKAHEAD, 0))
+                if step.key:
+                    requested.extend((t, t + step.hold))
+                    sched.write(step.key, step.hold)
+                    sched.write(release, step.gap)
+                else:
+                    sched.delay(step.gap)
+                t += step.hold + step.gap
+            sched.wait()
+        finally:
+            sched.listeners.remove(listener)
+    except KeyboardInterrupt:
+        sched.cancel(release)
+
+    errors = Timing()
+    if requested and actual:
+        for want, got in zip(requested, actual):
+            errors.add(abs((got - actual[0]) - (want - requested[0])))
+    return errors
+
 
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument('--serial', default=SERIAL_DEFAULT)
     parser.add_argument('--duration', type=float, default=.1)
+    parser.add_argument('--gap', type=float, default=.05)
     parser.add_argument('--count', type=int, default=1)
-    parser.add_argument('key')
+    parser.add_argument('--release', default='.')
+    parser.add_argument('--fps', type=float, default=60)
+    parser.add_argument('--script', help='input script (`-` for stdin)')
+    parser.add_argument(
+        '--framed',
+        action='store_true',
+        help='negotiate the framed protocol (switch firmware only)',
+    )
+    parser.add_argument('key', nargs='?')
     args = parser.parse_args()
 
-    with serial.Serial(args.serial, 9600) as ser:
-        for _ in range(args.count):
-            ser.write(args.key.encode())
-            time.sleep(args.duration)
-            ser.write(b'.')
-            time.sleep(.05)
+    if args.script is not None:
+        if args.script == '-':
+            lines = sys.stdin.readlines()
+        else:
+            with open(args.script) as f:
+                lines = f.readlines()
+        try:
+            items = parse(
+                lines,
+                hold=args.duration,
+                gap=args.gap,
+                fps=args.fps,
+            )
+        except ValueError as e:
+            print(f'{args.script}: {e}', file=sys.stderr)
+            return 1
+    elif args.key is not None:
+        step = Step(args.key.encode(), args.duration, args.gap)
+        items = (Repeat(args.count, (step,)),)
+    else:
+        parser.error('expected a key or --script')
+
+    ser: serial.Serial
+    if args.framed:
+        ser = Transport(args.serial)
+    else:
+        ser = serial.Serial(args.serial, 9600)
+    with ser:
+        errors = play(ser, items, release=args.release.encode())
+
+    summary = errors.summary()
+    print(
+        f'timing error: n={summary["count"]} '
+        f'p50={summary["p50"] * 1000:.2f}ms '
+        f'p95={summary["p95"] * 1000:.2f}ms '
+        f'max={summary["max"] * 1000:.2f}ms',
+    )
     return 0
 
 
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import argparse
-import functools
 import math
 import os.path
 import sys
@@ -14,43 +13,32 @@ import serial
 from scripts.engine import always_matches
 from scripts.engine import bye
 from scripts.engine import do
+from scripts.engine import find_template
 from scripts.engine import getframe
 from scripts.engine import make_vid
+from scripts.engine import match_template
 from scripts.engine import match_text
 from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
 from scripts.engine import Timeout
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.switch import SERIAL_DEFAULT
 
 HERE = os.path.abspath(os.path.dirname(__file__))
 
 
-@functools.lru_cache(maxsize=1)
-def _std_mask() -> tuple[numpy.ndarray, numpy.ndarray]:
-    tmpl = cv2.imread(os.path.join(HERE, 'templates', 'std-icon.png'))
-    mask = 255 - cv2.inRange(tmpl, tmpl[0][0], tmpl[0][0])
-    return tmpl, mask
+STD_ICON = os.path.join(HERE, 'templates', 'std-icon.png')
 
-
-@functools.lru_cache
-def _bird() -> tuple[numpy.ndarray, numpy.ndarray]:
-    tmpl = cv2.imread(os.path.join(HERE, 'templates', 'bird-icon.png'))
-    mask = numpy.any(tmpl == tmpl[0][0], axis=2)
-    return tmpl, mask
-
-
-def is_bird(frame: numpy.ndarray) -> bool:
-    tl = Point(y=487, x=1177)
-    br = Point(y=547, x=1237)
-    crop = frame[tl.y:br.y, tl.x:br.x]
-
-    bird, mask = _bird()
-    crop[numpy.nonzero(mask)] = bird[0][0]
-    avg = float(numpy.average(cv2.absdiff(crop, bird)))
-    return avg < 5
+is_bird = match_template(
+    os.path.join(HERE, 'templates', 'bird-icon.png'),
+    Point(y=487, x=1177),
+    Point(y=547, x=1237),
+    5,
+    mask=True,
+)
 
 
 def main() -> int:
@@ -80,9 +68,8 @@ def main() -> int:
 
         frame = getframe(vid)
 
-        tmpl, mask = _std_mask()
-        match = cv2.matchTemplate(frame, tmpl, cv2.TM_CCOEFF_NORMED, mask=mask)
-        _, _, _, (std_x, std_y) = cv2.minMaxLoc(match)
+        std_tl, std_br, _ = find_template(frame, STD_ICON, mask=True)
+        std_y, std_x = std_tl
         print(f'std at: {std_x}, {std_y}')
 
         hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
@@ -125,7 +112,7 @@ def main() -> int:
 
         mid_std = avg(
             (std_x, std_y),
-            (std_x + tmpl.shape[1], std_y + tmpl.shape[0]),
+            (std_br.x, std_br.y),
         )
 
         std_dx = mid_std[0] - base[0]
@@ -183,7 +170,7 @@ def main() -> int:
         ),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(
             vid=make_vid(),
             ser=ser,
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import argparse
-import functools
 import math
 import os.path
 import sys
@@ -19,15 +18,18 @@ from scripts.engine import always_matches
 from scripts.engine import bye
 from scripts.engine import Color
 from scripts.engine import do
+from scripts.engine import find_template
 from scripts.engine import getframe
 from scripts.engine import make_vid
 from scripts.engine import match_px
+from scripts.engine import match_template
 from scripts.engine import match_text
 from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
 from scripts.engine import Timeout
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.engine import Write
 from scripts.switch import SERIAL_DEFAULT
@@ -47,29 +49,15 @@ _green_bar = region_colorish(
 )
 
 
-@functools.lru_cache(maxsize=1)
-def _std_mask() -> tuple[numpy.ndarray, numpy.ndarray]:
-    tmpl = cv2.imread(os.path.join(HERE, 'templates', 'std-icon.png'))
-    mask = 255 - cv2.inRange(tmpl, tmpl[0][0], tmpl[0][0])
-    return tmpl, mask
+STD_ICON = os.path.join(HERE, 'templates', 'std-icon.png')
 
-
-@functools.lru_cache
-def _bird() -> tuple[numpy.ndarray, numpy.ndarray]:
-    tmpl = cv2.imread(os.path.join(HERE, 'templates', 'bird-icon.png'))
-    mask = numpy.any(tmpl == tmpl[0][0], axis=2)
-    return tmpl, mask
-
-
-def is_bird(frame: numpy.ndarray) -> bool:
-    tl = Point(y=487, x=1177)
-    br = Point(y=547, x=1237)
-    crop = frame[tl.y:br.y, tl.x:br.x]
-
-    bird, mask = _bird()
-    crop[numpy.nonzero(mask)] = bird[0][0]
-    avg = float(numpy.average(cv2.absdiff(crop, bird)))
-    return avg < 8
+is_bird = match_template(
+    os.path.join(HERE, 'templates', 'bird-icon.png'),
+    Point(y=487, x=1177),
+    Point(y=547, x=1237),
+    8,
+    mask=True,
+)
 
 
 def _save(name: str, frame: numpy.ndarray, *, success: bool) -> None:
@@ -263,9 +251,8 @@ def main() -> int:
 
         do(Press('B'), Wait(1))(vid, ser)
 
-        tmpl, mask = _std_mask()
-        match = cv2.matchTemplate(frame, tmpl, cv2.TM_CCOEFF_NORMED, mask=mask)
-        _, _, _, (std_x, std_y) = cv2.minMaxLoc(match)
+        std_tl, std_br, _ = find_template(frame, STD_ICON, mask=True)
+        std_y, std_x = std_tl
 
         if 760 <= std_x <= 762 and 508 <= std_y <= 510:
             std = 'close'
@@ -670,7 +657,7 @@ def main() -> int:
         ),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(
             vid=make_vid(),
             ser=ser,
@@ -4,7 +4,6 @@ import argparse
 
 import cv2
 import numpy
-import serial
 
 from scripts.engine import Action
 from scripts.engine import all_match
@@ -18,6 +17,7 @@ from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.switch import alarm
 from scripts.switch import SERIAL_DEFAULT
@@ -234,7 +234,7 @@ def main() -> int:
         **alarm('ALARM', quiet=args.quiet),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
@@ -15,6 +15,7 @@ from scripts.engine import make_vid
 from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
+from scripts.engine import scheduler
 from scripts.engine import States
 from scripts.engine import Timeout
 from scripts.engine import Wait
@@ -32,9 +33,7 @@ def main() -> int:
     def press(s: str, t: float) -> Action:
         def press_impl(vid: cv2.VideoCapture, ser: serial.Serial) -> None:
             print(s, end='', flush=True)
-            ser.write(s.encode())
-            time.sleep(t)
-            ser.write(b'.')
+            scheduler(ser).press(s.encode(), t, release=b'.', gap=0)
         return press_impl
 
     def nl(vid: object, ser: object) -> None:
@@ -31,6 +31,7 @@ def bootup(start: str, end: str) -> States:
                     Point(y=429, x=387),
                     Point(y=477, x=871),
                     invert=False,
+                    signature=True,
                 ),
                 do(Press('A'), Wait(.25)),
                 f'{start}__MEMORY_CARD',
@@ -43,6 +44,7 @@ def bootup(start: str, end: str) -> States:
                     Point(y=450, x=136),
                     Point(y=493, x=547),
                     invert=True,
+                    signature=True,
                 ),
                 do(Press('A'), Wait(.25)),
                 f'{start}__CONTINUE',
@@ -2,9 +2,7 @@ from __future__ import annotations
 
 import argparse
 import os.path
-import time
 
-import cv2
 import numpy
 import serial
 
@@ -17,7 +15,9 @@ from scripts.engine import match_text
 from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
+from scripts.engine import scheduler
 from scripts.engine import States
+from scripts.engine import template_diff
 from scripts.engine import Timeout
 from scripts.engine import Wait
 from scripts.thrids import alarm
@@ -27,9 +27,7 @@ from scripts.thrids import SERIAL_DEFAULT
 
 def press(s: str) -> Action:
     def press_impl(vid: object, ser: serial.Serial) -> None:
-        ser.write(s.encode())
-        time.sleep(.05)
-        ser.write(b'.')
+        scheduler(ser).press(s.encode(), .05, release=b'.', gap=0)
     return press_impl
 
 
@@ -41,17 +39,12 @@ def main() -> int:
     timeout = Timeout()
 
     def is_shiny(frame: numpy.ndarray) -> bool:
-        tl = Point(y=448, x=613).norm(frame.shape)
-        br = Point(y=499, x=675).norm(frame.shape)
-
-        crop = frame[tl.y:br.y, tl.x:br.x]
-
-        here = os.path.dirname(__file__)
-        base = cv2.imread(os.path.join(here, 'img', 'croconaw.png'))
-
-        diff = cv2.absdiff(base, crop)
-
-        avg = float(numpy.average(diff))
+        avg = template_diff(
+            frame,
+            os.path.join(os.path.dirname(__file__), 'img', 'croconaw.png'),
+            Point(y=448, x=613),
+            Point(y=499, x=675),
+        )
         print(f'diff: {avg:.2f}')
         return avg >= 3
 
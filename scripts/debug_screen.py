@@ -20,10 +20,14 @@ def main() -> int:
         def getframe() -> numpy.ndarray:
             return cv2.imread(args.image)
     else:
-        vid = make_vid()
+        # this script shows its own window, which cannot share the gui with
+        # the preview thread
+        vid = make_vid(preview=False)
 
         def getframe() -> numpy.ndarray:
-            return vid.read()[1]
+            _, frame = vid.read()
+            assert frame is not None
+            return frame
 
     pos = Point(y=-1, x=-1)
     start: Point | None = None
@@ -1,13 +1,26 @@
 from __future__ import annotations
 
+import atexit
+import concurrent.futures
+import contextlib
 import functools
+import hashlib
+import heapq
+import multiprocessing
 import os
+import queue
 import string
+import threading
 import time
+import weakref
+from collections.abc import Callable
+from collections.abc import Generator
 from collections.abc import Mapping
+from collections.abc import Sequence
 from typing import NamedTuple
 from typing import NoReturn
 from typing import Protocol
+from typing import TypeVar
 
 import cv2
 import numpy
@@ -15,27 +28,222 @@ import serial
 import tessdata
 import tesserocr
 
-SHOW = not os.environ.get('NOSHOW')
-
+from scripts import protocol
+from scripts.profiling import Profiler
+from scripts.recording import Recorder
+from scripts.templates import load_template
 
-def make_vid() -> cv2.VideoCapture:
-    vid = cv2.VideoCapture(0)
+SHOW = not os.environ.get('NOSHOW')
+SHOW_FPS = float(os.environ.get('SHOW_FPS', 30))
+CHANGE_DRIVEN = bool(os.environ.get('CHANGE_DRIVEN'))
+CHANGE_MAX_AGE = float(os.environ.get('CHANGE_MAX_AGE', 5))
+
+
+class Frame(numpy.ndarray):
+    """a captured frame, tagged with its capture time and sequence number
+
+    `cache` holds images derived from this frame (see `convert`) and
+    `results` the matchers already evaluated against it (see `matches`).
+    `history` is shared by the frames of one capture in change-driven mode.
+    """
+    seq: int
+    t: float
+    cache: dict[tuple[object, ...], numpy.ndarray]
+    results: dict[int, tuple[Matcher, bool]]
+    history: dict[int, tuple[Matcher, bytes, bool, float]] | None
+
+    def __array_finalize__(self, obj: object) -> None:
+        self.seq = getattr(obj, 'seq', 0)
+        self.t = getattr(obj, 't', 0.)
+        self.cache = {}
+        self.results = {}
+        self.history = None
+
+
+class Capture(cv2.VideoCapture):
+    """VideoCapture which owns the device on a background thread
+
+    only the latest frame is kept so readers never see a stale buffered frame
+    and sleeping on the main thread does not stall acquisition.  video files
+    are played back at their frame rate.  subclasses without a `source`
+    produce frames by overriding `_read_raw`.
+    """
+
+    def __init__(self, source: int | str | None = None) -> None:
+        if source is None:
+            super().__init__()
+        else:
+            super().__init__(source)
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self._cond = threading.Condition()
+        self._frame: Frame | None = None
+        self._seen = 0
+        self._done = False
+        self._thread: threading.Thread | None = None
+        self.preview: Preview | None = None
+        self.history: dict[int, tuple[Matcher, bytes, bool, float]] = {}
+
+    def _grab(self) -> None:
+        fps = self.get(cv2.CAP_PROP_FPS) if self.is_file else 0
+        start = time.monotonic()
+        seq = 0
+        while not self._done:
+            ret, img = self._read_raw()
+            if not ret:
+                break
+            seq += 1
+            if fps > 0:
+                time.sleep(max(start + seq / fps - time.monotonic(), 0))
+            frame = self._to_frame(img, seq)
+            with self._cond:
+                self._frame = frame
+                self._cond.notify_all()
+
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+
+    def _to_frame(self, img: numpy.ndarray, seq: int) -> Frame:
+        frame = img.view(Frame)
+        frame.seq = seq
+        frame.t = time.monotonic()
+        if CHANGE_DRIVEN:
+            frame.history = self.history
+        return frame
+
+    def _read_raw(self) -> tuple[bool, numpy.ndarray]:
+        return super().read()
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._grab, daemon=True)
+            self._thread.start()
+
+    def latest(self) -> Frame | None:
+        """the most recent frame (possibly already seen), does not wait"""
+        self._start()
+        with self._cond:
+            return self._frame
+
+    def read(  # type: ignore[override]
+            self,
+            image: object = None,
+    ) -> tuple[bool, Frame | None]:
+        """wait for a frame newer than the last one returned by `read`"""
+        self._start()
+        with self._cond:
+            self._cond.wait_for(
+                lambda: (
+                    self._done or
+                    (self._frame is not None and self._frame.seq > self._seen)
+                ),
+            )
+            if self._frame is None or self._frame.seq <= self._seen:
+                return False, None
+            self._seen = self._frame.seq
+            return True, self._frame
+
+    def release(self) -> None:
+        self._done = True
+        if self._thread is not None:
+            self._thread.join()
+        super().release()
+
+
+class Preview:
+    """renders the latest captured frame on its own thread
+
+    the control loop never waits on gui work: frames are shown at most `fps`
+    times per second with the current state name drawn on top.  hold `lock`
+    to use the 'game' window from another thread.
+    """
+
+    def __init__(self, vid: Capture, *, fps: float) -> None:
+        self.vid = vid
+        self.fps = fps
+        self.state = ''
+        self.lock = threading.Lock()
+        self.quit = threading.Event()
+        self._thread = threading.Thread(target=self._render, daemon=True)
+        self._thread.start()
+
+    def _render(self) -> None:
+        seq = 0
+        while not self.quit.is_set():
+            end = time.monotonic() + 1 / self.fps
+
+            with self.lock:
+                frame = self.vid.latest()
+                if frame is not None and frame.seq != seq:
+                    seq = frame.seq
+                    img = numpy.array(frame)
+                    for color, thickness in ((0, 4), (255, 1)):
+                        cv2.putText(
+                            img,
+                            self.state,
+                            (10, 30),
+                            cv2.FONT_HERSHEY_SIMPLEX,
+                            .75,
+                            (color, color, color),
+                            thickness,
+                        )
+                    cv2.imshow('game', img)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    self.quit.set()
+
+            time.sleep(max(end - time.monotonic(), 0))
+
+
+_OVERRIDE_VID: list[Capture] = []
+
+
+def override_vid(vid: Capture) -> None:
+    """make `make_vid` return `vid` instead (see `scripts.sim`)"""
+    _OVERRIDE_VID[:] = [vid]
+
+
+def make_vid(source: int | str = 0, *, preview: bool = SHOW) -> Capture:
+    if _OVERRIDE_VID:
+        vid = _OVERRIDE_VID[0]
+        if preview and vid.preview is None:
+            vid.preview = Preview(vid, fps=SHOW_FPS)
+        return vid
+
+    vid = Capture(source)
     vid.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
     vid.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
     vid.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # default: 3
+    if preview:
+        vid.preview = Preview(vid, fps=SHOW_FPS)
     return vid
 
 
 def getframe(vid: cv2.VideoCapture) -> numpy.ndarray:
     _, frame = vid.read()
-    if SHOW:
+    if isinstance(vid, Capture):
+        if vid.preview is not None and vid.preview.quit.is_set():
+            raise SystemExit(0)
+    elif SHOW:
         cv2.imshow('game', frame)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             raise SystemExit(0)
     return frame
 
 
+def _show_state(vid: cv2.VideoCapture, state: str) -> None:
+    if isinstance(vid, Capture) and vid.preview is not None:
+        vid.preview.state = state
+
+
 def request_box(vid: cv2.VideoCapture) -> tuple[Point, Point]:
+    if isinstance(vid, Capture) and vid.preview is not None:
+        with vid.preview.lock:
+            return _request_box(vid)
+    else:
+        return _request_box(vid)
+
+
+def _request_box(vid: cv2.VideoCapture) -> tuple[Point, Point]:
     start: Point | None = None
     pos = Point(y=-1, x=-1)
     end: Point | None = None
@@ -70,12 +278,285 @@ def request_box(vid: cv2.VideoCapture) -> tuple[Point, Point]:
     return start, end
 
 
+class InputTiming(NamedTuple):
+    """when a framed command was written and when it became a usb report
+
+    `written` and `reported` are host `time.monotonic()` times, `firmware`
+    is how long the firmware took from receiving the frame to sending it
+    """
+    seq: int
+    written: float
+    reported: float
+    firmware: float
+
+
+class Transport(serial.Serial):
+    """serial connection to the switch controller
+
+    the framed protocol (see scripts/protocol.py) is negotiated when the
+    firmware supports it, otherwise the legacy ascii commands are written
+    unchanged.  either way `write` takes legacy commands.
+
+    only the most recent frame is retransmitted if it is not acknowledged:
+    resending an older frame would undo the input which replaced it.
+
+    after `timing(True)` an `InputTiming` is put on `timings` for each
+    command once the firmware has sent its report.
+
+    firmware which does not answer the legacy handshake is also probed with a
+    framed ping, in case it is still framed from a connection which was not
+    closed (for example after the host crashed).  older firmware may read the
+    ping as a stray input so the legacy fallback starts with a release.  pass
+    `recover=False` for devices which should not see framed bytes at all.
+    """
+
+    ACK_TIMEOUT = .05
+    RETRIES = 3
+
+    def __init__(self, port: str, *, recover: bool = True) -> None:
+        super().__init__(port, protocol.LEGACY_BAUD, timeout=.25)
+        self.framed = False
+        self.retransmits = 0
+        self.timings: queue.Queue[InputTiming] = queue.Queue()
+        self._seq = protocol.NO_SEQ
+        self._written: dict[int, float] = {}
+        self._pending: tuple[int, bytes, float, int] | None = None
+        self._lock = threading.Lock()
+        self._closing = False
+        self._thread: threading.Thread | None = None
+
+        self._negotiate(recover=recover)
+        if self.framed:
+            self.timeout = self.ACK_TIMEOUT
+            self._thread = threading.Thread(target=self._read, daemon=True)
+            self._thread.start()
+        print(f'serial protocol: {"framed" if self.framed else "legacy"}')
+
+    def _negotiate(self, *, recover: bool) -> None:
+        self.reset_input_buffer()
+        hello = bytes((protocol.PING, protocol.VERSION))
+        super().write(hello)
+        reply = super().read(len(hello))
+        if reply == hello:
+            self.flush()
+            self.baudrate = protocol.BAUD
+            self.framed = True
+        elif not reply and recover:
+            # the firmware may still be framed from a previous connection
+            self.baudrate = protocol.BAUD
+            super().write(protocol.encode(protocol.NO_SEQ, protocol.PING))
+            decoder = protocol.Decoder()
+            msgs = decoder.feed(super().read(5))
+            if msgs and msgs[0].ok and msgs[0].c == protocol.ACK:
+                self.framed = True
+            else:
+                self.baudrate = protocol.LEGACY_BAUD
+                super().write(b'0')
+
+    def _send(self, c: int, payload: bytes = b'') -> None:
+        with self._lock:
+            self._seq = protocol.next_seq(self._seq)
+            frame = protocol.encode(self._seq, c, payload)
+            self._written[self._seq] = time.monotonic()
+            self._pending = (self._seq, frame, time.monotonic(), 0)
+            super().write(frame)
+
+    def _retransmit(self, *, force: bool = False) -> None:
+        with self._lock:
+            if self._pending is None:
+                return
+            seq, frame, sent, tries = self._pending
+            if not force and time.monotonic() - sent < self.ACK_TIMEOUT:
+                return
+            elif tries >= self.RETRIES:
+                print(f'frame {seq} was not acknowledged!')
+                self._pending = None
+            else:
+                self.retransmits += 1
+                self._pending = (seq, frame, time.monotonic(), tries + 1)
+                super().write(frame)
+
+    def _read(self) -> None:
+        decoder = protocol.Decoder()
+        while not self._closing:
+            try:
+                bts = super().read(self.in_waiting or 1)
+            except (OSError, TypeError):  # closed while reading
+                break
+
+            for msg in decoder.feed(bts):
+                if not msg.ok:
+                    continue
+                elif msg.c == protocol.TIMING and len(msg.payload) == 8:
+                    received = int.from_bytes(msg.payload[:4], 'little')
+                    sent = int.from_bytes(msg.payload[4:], 'little')
+                    timing = InputTiming(
+                        seq=msg.seq,
+                        written=self._written.get(msg.seq, 0.),
+                        reported=time.monotonic(),
+                        firmware=((sent - received) & 0xffffffff) / 1e6,
+                    )
+                    self.timings.put(timing)
+                    continue
+                with self._lock:
+                    current = (
+                        self._pending is not None and
+                        self._pending[0] == msg.seq
+                    )
+                    if current and msg.c == protocol.ACK:
+                        self._pending = None
+                if current and msg.c == protocol.NAK:
+                    self._retransmit(force=True)
+            self._retransmit()
+
+    def timing(self, enabled: bool) -> None:
+        if not self.framed:
+            raise ValueError('timing requires the framed protocol')
+        self._send(protocol.TIMING, bytes((enabled,)))
+
+    def write(self, bts: bytes) -> int:
+        if not self.framed:
+            return super().write(bts)
+
+        for c, payload in protocol.split_commands(bts):
+            self._send(c, payload)
+        return len(bts)
+
+    def close(self) -> None:
+        if self.framed and self.is_open:
+            self._send(protocol.LEGACY)
+            self.flush()
+        self._closing = True
+        if self._thread is not None:
+            self._thread.join()
+        super().close()
+
+
+class Scheduler:
+    """writes timed input to a serial port from a background thread
+
+    input is queued on a timeline: each write happens once the previously
+    queued input is done, and queueing returns immediately.  `tail` is the
+    (monotonic) time at which all queued input will have been written and
+    `last` the most recently queued input.  `listeners` are called with the
+    time and bytes of every write.  `release` is the neutral input of the
+    most recent `press` (the firmware's ones differ), which `cancel` sends.
+
+    if a write fails the queued input is dropped and the error is raised from
+    the next call which queues or waits for input.
+    """
+
+    def __init__(self, ser: serial.Serial) -> None:
+        self.ser = ser
+        self.tail = 0.
+        self.last = b''
+        self.release = b'0'
+        self.listeners: list[Callable[[float, bytes], None]] = []
+        self._cond = threading.Condition()
+        self._events: list[tuple[float, int, bytes]] = []
+        self._n = 0
+        self._error: Exception | None = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        with self._cond:
+            while True:
+                if not self._events:
+                    self._cond.wait()
+                    continue
+
+                timeout = self._events[0][0] - time.monotonic()
+                if timeout > 0:
+                    self._cond.wait(timeout)
+                    continue
+
+                _, _, bts = heapq.heappop(self._events)
+                try:
+                    self._write(bts)
+                except Exception as e:
+                    self._error = e
+                    self._events.clear()
+                    self.tail = time.monotonic()
+                self._cond.notify_all()
+
+    def _raise(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _write(self, bts: bytes) -> None:
+        self.ser.write(bts)
+        for listener in self.listeners:
+            listener(time.monotonic(), bts)
+
+    def write(self, bts: bytes, duration: float = 0.) -> None:
+        """queue `bts`, holding the timeline for `duration` afterwards"""
+        with self._cond:
+            self._raise()
+            start = max(time.monotonic(), self.tail)
+            heapq.heappush(self._events, (start, self._n, bts))
+            self._n += 1
+            self.tail = start + duration
+            self.last = bts
+            self._cond.notify_all()
+
+    def delay(self, duration: float) -> None:
+        """hold the timeline (keeping the current input) for `duration`"""
+        with self._cond:
+            self.tail = max(time.monotonic(), self.tail) + duration
+
+    def press(
+            self,
+            bts: bytes,
+            duration: float,
+            *,
+            release: bytes = b'0',
+            gap: float = .075,
+    ) -> None:
+        with self._cond:
+            self.write(bts, duration)
+            self.write(release, gap)
+            self.release = release
+
+    def remaining(self) -> float:
+        return max(self.tail - time.monotonic(), 0)
+
+    def busy(self) -> bool:
+        return self.remaining() > 0
+
+    def wait(self) -> None:
+        """wait until all queued input has been written (and held)"""
+        with self._cond:
+            while self._error is None:
+                if self._events:
+                    self._cond.wait()
+                elif (remaining := self.tail - time.monotonic()) > 0:
+                    self._cond.wait(remaining)
+                else:
+                    break
+            self._raise()
+
+    def cancel(self, release: bytes | None = None) -> None:
+        """drop queued input and release everything right now"""
+        with self._cond:
+            if release is None:
+                release = self.release
+            self._raise()
+            self._events.clear()
+            self._write(release)
+            self.tail = time.monotonic()
+            self.last = release
+
+
+@functools.lru_cache
+def scheduler(ser: serial.Serial) -> Scheduler:
+    return Scheduler(ser)
+
+
 def press(ser: serial.Serial, s: str, duration: float) -> None:
     print(f'{s=} {duration=}')
-    ser.write(s.encode())
-    time.sleep(duration)
-    ser.write(b'0')
-    time.sleep(.075)
+    scheduler(ser).press(s.encode(), duration)
 
 
 def wait_and_render(vid: cv2.VideoCapture, t: float) -> None:
@@ -127,71 +608,400 @@ def always_matches(frame: object) -> bool:
     return True
 
 
+class Roi:
+    """a region of the frame (in `NORM` coordinates)
+
+    the pixel slices are computed once per frame shape so cropping is a dict
+    lookup and a slice.  use `roi(...)` to share them between equal regions.
+    """
+
+    __slots__ = ('top_left', 'bottom_right', '_slices')
+
+    def __init__(self, top_left: Point, bottom_right: Point) -> None:
+        self.top_left = top_left
+        self.bottom_right = bottom_right
+        self._slices: dict[tuple[int, int, int], tuple[slice, slice]] = {}
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.top_left}, {self.bottom_right})'
+
+    def slices(self, dims: tuple[int, int, int]) -> tuple[slice, slice]:
+        try:
+            return self._slices[dims]
+        except KeyError:
+            tl = self.top_left.norm(dims)
+            br = self.bottom_right.norm(dims)
+            ret = self._slices[dims] = (slice(tl.y, br.y), slice(tl.x, br.x))
+            return ret
+
+    def __call__(self, frame: numpy.ndarray) -> numpy.ndarray:
+        return frame[self.slices(frame.shape)]
+
+
+@functools.lru_cache(maxsize=None)
+def roi(top_left: Point, bottom_right: Point) -> Roi:
+    return Roi(top_left, bottom_right)
+
+
+_M = TypeVar('_M', bound=Matcher)
+_ROIS: weakref.WeakKeyDictionary[Matcher, tuple[Roi, ...]]
+_ROIS = weakref.WeakKeyDictionary()
+
+
+def reads(*rois: Roi) -> Callable[[_M], _M]:
+    """declare the regions a matcher looks at
+
+    in change-driven mode (CHANGE_DRIVEN=1) a declared matcher is only
+    re-evaluated once one of its regions changes (or its result is older
+    than CHANGE_MAX_AGE seconds).  only declare matchers whose result
+    depends on nothing but those pixels!
+    """
+    def reads_decorator(matcher: _M) -> _M:
+        _ROIS[matcher] = rois
+        return matcher
+    return reads_decorator
+
+
+reads()(always_matches)
+
+
+def declared_rois(matcher: Matcher) -> tuple[Roi, ...] | None:
+    """the regions declared (with `reads`) for a matcher, if any"""
+    if isinstance(matcher, Interrupt):
+        return declared_rois(matcher.matcher)
+    try:
+        return _ROIS.get(matcher)
+    except TypeError:  # cannot be weakly referenced, so never declared
+        return None
+
+
+def _signature(frame: numpy.ndarray, region: Roi) -> bytes:
+    def _signature_impl() -> numpy.ndarray:
+        ys, xs = region.slices(frame.shape)
+        img = frame[
+            ys.start:max(ys.stop, ys.start + 1),
+            xs.start:max(xs.stop, xs.start + 1),
+        ]
+        # average 4x4 blocks: fine enough that a changed glyph of text still
+        # changes the signature, without quantizing which would hide it
+        size = (max(img.shape[1] // 4, 1), max(img.shape[0] // 4, 1))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    small = _cached(frame, ('signature', region), _signature_impl)
+    return hashlib.blake2b(small.tobytes(), digest_size=16).digest()
+
+
+def _evaluate(matcher: Matcher, frame: Frame) -> bool:
+    if frame.history is None:
+        return matcher(frame)
+    rois = declared_rois(matcher)
+    if rois is None:
+        return matcher(frame)
+
+    sig = b''.join(_signature(frame, region) for region in rois)
+    prev = frame.history.get(id(matcher))
+    if (
+            prev is not None and
+            prev[1] == sig and
+            frame.t < prev[3] + CHANGE_MAX_AGE
+    ):
+        return prev[2]
+    else:
+        ret = matcher(frame)
+        frame.history[id(matcher)] = (matcher, sig, ret, frame.t)
+        return ret
+
+
+def matches(matcher: Matcher, frame: numpy.ndarray) -> bool:
+    """evaluate `matcher`, at most once per captured frame"""
+    if not isinstance(frame, Frame):
+        return matcher(frame)
+
+    # the matcher is stored alongside so its id cannot be reused
+    cached = frame.results.get(id(matcher))
+    if cached is not None:
+        return cached[1]
+    else:
+        ret = _evaluate(matcher, frame)
+        frame.results[id(matcher)] = (matcher, ret)
+        return ret
+
+
+def _reads_all(matchers: Sequence[Matcher]) -> Callable[[_M], _M]:
+    """declare the regions of `matchers` if every one of them is declared"""
+    rois: list[Roi] = []
+    for matcher in matchers:
+        matcher_rois = declared_rois(matcher)
+        if matcher_rois is None:
+            return lambda matcher: matcher
+        rois.extend(r for r in matcher_rois if r not in rois)
+    return reads(*rois)
+
+
 def all_match(*matchers: Matcher) -> Matcher:
+    @_reads_all(matchers)
     def all_match_impl(frame: numpy.ndarray) -> bool:
-        return all(matcher(frame) for matcher in matchers)
+        return all(matches(matcher, frame) for matcher in matchers)
     return all_match_impl
 
 
 def any_match(*matchers: Matcher) -> Matcher:
+    @_reads_all(matchers)
     def any_match_impl(frame: numpy.ndarray) -> bool:
-        return any(matcher(frame) for matcher in matchers)
+        return any(matches(matcher, frame) for matcher in matchers)
     return any_match_impl
 
 
+class Px(NamedTuple):
+    point: Point
+    colors: tuple[Color, ...]
+    tolerance: int = 2000
+
+
+class PixelBank:
+    """several `match_px`-style checks evaluated in one numpy expression
+
+    calling the bank matches when every entry matches, `.any` when at least
+    one does and `.results` gives the per-entry booleans
+    """
+
+    def __init__(self, *pxs: Px) -> None:
+        self.pxs = pxs
+
+        n = max((len(px.colors) for px in pxs), default=0)
+        self._colors = numpy.zeros((len(pxs), n, 3), dtype=numpy.int32)
+        self._valid = numpy.zeros((len(pxs), n), dtype=bool)
+        for i, px in enumerate(pxs):
+            if px.colors:
+                self._colors[i, :len(px.colors)] = px.colors
+                self._valid[i, :len(px.colors)] = True
+        self._tolerance = numpy.array([[px.tolerance] for px in pxs])
+
+        self._coords: dict[tuple[int, ...], tuple[numpy.ndarray, ...]] = {}
+
+        reads(*(roi(px.point, px.point) for px in pxs))(self)
+
+    def _index(self, dims: tuple[int, int, int]) -> tuple[numpy.ndarray, ...]:
+        try:
+            return self._coords[dims]
+        except KeyError:
+            points = [px.point.norm(dims) for px in self.pxs]
+            ret = self._coords[dims] = (
+                numpy.array([point.y for point in points], dtype=numpy.intp),
+                numpy.array([point.x for point in points], dtype=numpy.intp),
+            )
+            return ret
+
+    def results(self, frame: numpy.ndarray) -> numpy.ndarray:
+        ys, xs = self._index(frame.shape)
+        px = frame[ys, xs].astype(numpy.int32)[:, numpy.newaxis]
+        dist = numpy.sum((px - self._colors) ** 2, axis=2)
+        return numpy.any((dist < self._tolerance) & self._valid, axis=1)
+
+    def __call__(self, frame: numpy.ndarray) -> bool:
+        return bool(numpy.all(self.results(frame)))
+
+    def any(self, frame: numpy.ndarray) -> bool:
+        return bool(numpy.any(self.results(frame)))
+
+
 def match_px(point: Point, *colors: Color) -> Matcher:
-    def match_px_impl(frame: numpy.ndarray) -> bool:
-        px = frame[point.norm(frame.shape)]
-        for color in colors:
-            if sum((c2 - c1) * (c2 - c1) for c1, c2 in zip(px, color)) < 2000:
-                return True
-        else:
-            return False
-    return match_px_impl
+    return PixelBank(Px(point, colors))
 
 
 def match_px_exact(px: Point, c: Color) -> Matcher:
+    region = roi(px, px)
+
+    @reads(region)
     def match_px_exact_impl(frame: numpy.ndarray) -> bool:
-        pt = px.norm(frame.shape)
-        return numpy.array_equal(frame[pt.y][pt.x], c)
+        ys, xs = region.slices(frame.shape)
+        return numpy.array_equal(frame[ys.start, xs.start], c)
     return match_px_exact_impl
 
 
+class TessPool:
+    """identically configured tesseract apis, one per concurrent caller
+
+    tesserocr releases the gil while recognizing so several threads can ocr
+    at the same time (see `get_texts`)
+    """
+
+    def __init__(self, **variables: str) -> None:
+        self.variables = variables
+        self._apis: queue.SimpleQueue[tesserocr.PyTessBaseAPI]
+        self._apis = queue.SimpleQueue()
+
+    def _new(self) -> tesserocr.PyTessBaseAPI:
+        api = tesserocr.PyTessBaseAPI(
+            tessdata.data_path(),
+            'eng',
+            psm=tesserocr.PSM.SINGLE_LINE,
+        )
+        for k, v in self.variables.items():
+            api.SetVariable(k, v)
+        return api
+
+    @contextlib.contextmanager
+    def api(self) -> Generator[tesserocr.PyTessBaseAPI]:
+        try:
+            api = self._apis.get_nowait()
+        except queue.Empty:
+            api = self._new()
+        try:
+            yield api
+        finally:
+            self._apis.put(api)
+
+
 @functools.lru_cache
-def _tessapi() -> tesserocr.PyTessBaseAPI:
-    return tesserocr.PyTessBaseAPI(
-        tessdata.data_path(),
-        'eng',
-        psm=tesserocr.PSM.SINGLE_LINE,
-    )
+def _tessapi() -> TessPool:
+    return TessPool()
 
 
 @functools.lru_cache
 def tessapi_int() -> tesserocr.PyTessBaseAPI:
-    api = tesserocr.PyTessBaseAPI(
-        tessdata.data_path(),
-        'eng',
-        psm=tesserocr.PSM.SINGLE_LINE,
-    )
-    api.SetVariable('tessedit_char_whitelist', string.digits)
-    return api
+    return TessPool(tessedit_char_whitelist=string.digits)._new()
+
+
+class OCRCache:
+    """size-bounded LRU of ocr results keyed by a hash of the image bytes"""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._cache: dict[tuple[object, ...], str] = {}
+
+    def get(self, key: tuple[object, ...]) -> str | None:
+        with self._lock:
+            ret = self._cache.pop(key, None)
+            if ret is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._cache[key] = ret  # most recently used goes last
+            return ret
+
+    def put(self, key: tuple[object, ...], text: str) -> None:
+        with self._lock:
+            self._cache[key] = text
+            if len(self._cache) > self.maxsize:
+                del self._cache[next(iter(self._cache))]
+
+
+ocr_cache = OCRCache(int(os.environ.get('OCR_CACHE_SIZE', 1024)))
 
 
 def tess_text_u8(
         img: numpy.ndarray,
         *,
-        tessapi: tesserocr.PyTessBaseAPI | None = None,
+        tessapi: tesserocr.PyTessBaseAPI | TessPool | None = None,
 ) -> str:
+    """ocr a grayscale image
+
+    `tessapi` is a tesseract api (only to be used by one thread at a time) or
+    a `TessPool`, by default a shared pool
+    """
     tessapi = tessapi or _tessapi()
 
-    tessapi.SetImageBytes(
-        img.tobytes(),
-        width=img.shape[1],
-        height=img.shape[0],
-        bytes_per_pixel=1,
-        bytes_per_line=img.shape[1],
-    )
-    return tessapi.GetUTF8Text().strip()
+    bts = img.tobytes()
+    digest = hashlib.blake2b(bts, digest_size=16).digest()
+    key = (tessapi, img.shape, digest)
+    cached = ocr_cache.get(key)
+    if cached is not None:
+        return cached
+
+    ctx: contextlib.AbstractContextManager[tesserocr.PyTessBaseAPI]
+    if isinstance(tessapi, TessPool):
+        ctx = tessapi.api()
+    else:
+        ctx = contextlib.nullcontext(tessapi)
+    with ctx as api:
+        api.SetImageBytes(
+            bts,
+            width=img.shape[1],
+            height=img.shape[0],
+            bytes_per_pixel=1,
+            bytes_per_line=img.shape[1],
+        )
+        ret = api.GetUTF8Text().strip()
+    ocr_cache.put(key, ret)
+    return ret
+
+
+def crop(
+        frame: numpy.ndarray,
+        top_left: Point | None = None,
+        bottom_right: Point | None = None,
+) -> numpy.ndarray:
+    if top_left is None or bottom_right is None:
+        return frame
+    return roi(top_left, bottom_right)(frame)
+
+
+def _cached(
+        frame: numpy.ndarray,
+        key: tuple[object, ...],
+        func: Callable[[], numpy.ndarray],
+) -> numpy.ndarray:
+    if not isinstance(frame, Frame):
+        return func()
+
+    try:
+        return frame.cache[key]
+    except KeyError:
+        ret = frame.cache[key] = func()
+        return ret
+
+
+def convert(
+        frame: numpy.ndarray,
+        code: int,
+        top_left: Point | None = None,
+        bottom_right: Point | None = None,
+) -> numpy.ndarray:
+    """cv2.cvtColor of the frame (or a region of it), memoized per frame
+
+    the returned image is shared -- do not modify it!
+    """
+    def _convert() -> numpy.ndarray:
+        if top_left is not None and isinstance(frame, Frame):
+            full = frame.cache.get((code, None, None))
+            if full is not None:
+                return crop(full, top_left, bottom_right)
+        return cv2.cvtColor(crop(frame, top_left, bottom_right), code)
+    return _cached(frame, (code, top_left, bottom_right), _convert)
+
+
+def to_gray(
+        frame: numpy.ndarray,
+        top_left: Point | None = None,
+        bottom_right: Point | None = None,
+) -> numpy.ndarray:
+    return convert(frame, cv2.COLOR_BGR2GRAY, top_left, bottom_right)
+
+
+def to_hsv(
+        frame: numpy.ndarray,
+        top_left: Point | None = None,
+        bottom_right: Point | None = None,
+) -> numpy.ndarray:
+    return convert(frame, cv2.COLOR_BGR2HSV, top_left, bottom_right)
+
+
+def to_otsu(
+        frame: numpy.ndarray,
+        top_left: Point | None = None,
+        bottom_right: Point | None = None,
+) -> numpy.ndarray:
+    """otsu-binarized grayscale of the frame, memoized per frame"""
+    def _otsu() -> numpy.ndarray:
+        _, ret = cv2.threshold(
+            to_gray(frame, top_left, bottom_right),
+            0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU,
+        )
+        return ret
+    return _cached(frame, ('otsu', top_left, bottom_right), _otsu)
 
 
 def get_text(
@@ -200,41 +1010,281 @@ def get_text(
         bottom_right: Point,
         *,
         invert: bool,
-        tessapi: tesserocr.PyTessBaseAPI | None = None,
+        tessapi: tesserocr.PyTessBaseAPI | TessPool | None = None,
 ) -> str:
-    tl_norm = top_left.norm(frame.shape)
-    br_norm = bottom_right.norm(frame.shape)
-
-    crop = frame[tl_norm.y:br_norm.y, tl_norm.x:br_norm.x]
-    crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-    _, crop = cv2.threshold(
-        crop, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU,
-    )
+    crop = to_otsu(frame, top_left, bottom_right)
     if invert:
         crop = cv2.bitwise_not(crop)
 
     return tess_text_u8(crop, tessapi=tessapi)
 
 
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))
+
+
+@functools.lru_cache
+def _ocr_executor() -> concurrent.futures.ThreadPoolExecutor:
+    return concurrent.futures.ThreadPoolExecutor(
+        OCR_WORKERS,
+        thread_name_prefix='ocr',
+    )
+
+
+def get_texts(
+        frame: numpy.ndarray,
+        regions: Sequence[tuple[Point, Point, bool]],
+        *,
+        tessapi: tesserocr.PyTessBaseAPI | TessPool | None = None,
+) -> list[str]:
+    """`get_text` for several (top_left, bottom_right, invert) at once
+
+    the regions are recognized in parallel unless `tessapi` is a single api
+    or this already runs in a worker process
+    """
+    if (
+            OCR_WORKERS <= 1 or
+            # a process pool already uses every cpu, threads would only add
+            # a tesseract api per process and thread
+            multiprocessing.parent_process() is not None or
+            (tessapi is not None and not isinstance(tessapi, TessPool))
+    ):
+        return [
+            get_text(frame, tl, br, invert=invert, tessapi=tessapi)
+            for tl, br, invert in regions
+        ]
+
+    futures = [
+        _ocr_executor().submit(
+            get_text, frame, tl, br, invert=invert, tessapi=tessapi,
+        )
+        for tl, br, invert in regions
+    ]
+    return [future.result() for future in futures]
+
+
+SIGNATURES = os.environ.get('SIGNATURES', '')
+SIGNATURE_REJECT = .2
+
+
+def _signature_path(
+        text: str,
+        top_left: Point,
+        bottom_right: Point,
+        invert: bool,
+) -> str:
+    key = repr((text, top_left, bottom_right, invert)).encode()
+    name = hashlib.blake2b(key, digest_size=8).hexdigest()
+    return os.path.join(SIGNATURES, f'{name}.npy')
+
+
 def match_text(
         text: str,
         top_left: Point,
         bottom_right: Point,
         *,
         invert: bool,
+        signature: bool = False,
 ) -> Matcher:
+    """match the ocr'd text of a region
+
+    with `signature=True` the binarized region is remembered the first time
+    the text matches (and persisted to `$SIGNATURES` if set).  frames which
+    differ from it in more than `SIGNATURE_REJECT` of the pixels are rejected
+    without running ocr.
+    """
+    ref: numpy.ndarray | None = None
+    if signature and SIGNATURES:
+        path = _signature_path(text, top_left, bottom_right, invert)
+        if os.path.exists(path):
+            ref = numpy.load(path)
+
+    @reads(roi(top_left, bottom_right))
     def match_text_impl(frame: numpy.ndarray) -> bool:
-        return text == get_text(frame, top_left, bottom_right, invert=invert)
+        nonlocal ref
+
+        if signature:
+            img = to_otsu(frame, top_left, bottom_right)
+            if ref is not None and ref.shape == img.shape:
+                diff = numpy.count_nonzero(img != ref) / img.size
+                if diff > SIGNATURE_REJECT:
+                    return False
+
+        ret = text == get_text(frame, top_left, bottom_right, invert=invert)
+        if ret and signature and ref is None:
+            ref = numpy.array(img)
+            if SIGNATURES:
+                os.makedirs(SIGNATURES, exist_ok=True)
+                path = _signature_path(text, top_left, bottom_right, invert)
+                numpy.save(path, ref)
+        return ret
     return match_text_impl
 
 
-def bye(vid: object, ser: object) -> None:
+class Template(NamedTuple):
+    img: numpy.ndarray
+    mask: numpy.ndarray | None  # 255 where the template is compared
+
+
+@functools.lru_cache
+def _template(
+        path: str,
+        mask: bool,
+        size: tuple[int, int] | None = None,
+) -> Template:
+    """the template (and its mask) from `path`, resized to (height, width)"""
+    if size is not None:
+        tmpl = _template(path, mask)
+        if tmpl.img.shape[:2] == size:
+            return tmpl
+        dsize = (size[1], size[0])
+        img = cv2.resize(tmpl.img, dsize, interpolation=cv2.INTER_AREA)
+        if tmpl.mask is None:
+            return Template(img, None)
+        else:
+            fg = cv2.resize(tmpl.mask, dsize, interpolation=cv2.INTER_NEAREST)
+            return Template(img, fg)
+
+    img = load_template(path, f'template-{os.path.abspath(path)}')
+    if mask:
+        bg = img[0, 0]
+        return Template(img, 255 - cv2.inRange(img, bg, bg))
+    else:
+        return Template(img, None)
+
+
+def template_diff(
+        frame: numpy.ndarray,
+        path: str,
+        top_left: Point,
+        bottom_right: Point,
+        *,
+        mask: bool = False,
+) -> float:
+    """mean absolute difference of a region and a template
+
+    the template is resized to the region.  with `mask=True` the pixels of
+    the template's background (the colour of its top left pixel) count as
+    equal.
+    """
+    img = crop(frame, top_left, bottom_right)
+    tmpl = _template(path, mask, img.shape[:2])
+    diff = cv2.absdiff(img, tmpl.img)
+    if tmpl.mask is not None:
+        diff = cv2.bitwise_and(diff, diff, mask=tmpl.mask)
+    return float(numpy.average(diff))
+
+
+def match_template(
+        path: str,
+        top_left: Point,
+        bottom_right: Point,
+        threshold: float,
+        *,
+        mask: bool = False,
+) -> Matcher:
+    """match when the region differs from the template less than `threshold`
+
+    (see `template_diff`)
+    """
+    @reads(roi(top_left, bottom_right))
+    def match_template_impl(frame: numpy.ndarray) -> bool:
+        diff = template_diff(frame, path, top_left, bottom_right, mask=mask)
+        return diff < threshold
+    return match_template_impl
+
+
+def find_template(
+        frame: numpy.ndarray,
+        path: str,
+        top_left: Point | None = None,
+        bottom_right: Point | None = None,
+        *,
+        mask: bool = False,
+        levels: int = 1,
+) -> tuple[Point, Point, float]:
+    """locate a template in the frame (or in the search window)
+
+    returns the top left and bottom right of the best match and its score
+    (`cv2.TM_CCOEFF_NORMED`, at most 1).  the template is scaled with the
+    frame.  with `levels > 1` the search starts on a downscaled image pyramid
+    and is refined around the best match at each finer level.
+    """
+    region = crop(frame, top_left, bottom_right)
+    if top_left is not None and bottom_right is not None:
+        offset = top_left.norm(frame.shape)
+    else:
+        offset = Point(y=0, x=0)
+    th, tw = _template(path, mask).img.shape[:2]
+    size = Point(y=th, x=tw).norm(frame.shape)
+
+    y0, x0, y1, x1 = 0, 0, region.shape[0], region.shape[1]
+    y = x = 0
+    score = 0.
+    for level in reversed(range(levels)):
+        scale = 2 ** level
+        img = region[y0:y1, x0:x1]
+        tmpl = _template(
+            path,
+            mask,
+            (max(size.y // scale, 1), max(size.x // scale, 1)),
+        )
+        if scale > 1:
+            dsize = (img.shape[1] // scale, img.shape[0] // scale)
+            if dsize[1] < tmpl.img.shape[0] or dsize[0] < tmpl.img.shape[1]:
+                continue
+            img = cv2.resize(img, dsize, interpolation=cv2.INTER_AREA)
+
+        result = cv2.matchTemplate(
+            img, tmpl.img, cv2.TM_CCOEFF_NORMED, mask=tmpl.mask,
+        )
+        _, score, _, (best_x, best_y) = cv2.minMaxLoc(result)
+        y, x = y0 + best_y * scale, x0 + best_x * scale
+
+        margin = 2 * scale
+        y0, x0 = max(y - margin, 0), max(x - margin, 0)
+        y1 = min(y + size.y + margin, region.shape[0])
+        x1 = min(x + size.x + margin, region.shape[1])
+
+    y, x = offset.y + y, offset.x + x
+    return (
+        Point(y=y, x=x).denorm(frame.shape),
+        Point(y=y + size.y, x=x + size.x).denorm(frame.shape),
+        score,
+    )
+
+
+def bye(vid: object, ser: serial.Serial) -> None:
+    scheduler(ser).wait()
     raise SystemExit(0)
 
 
+def cancel_input(vid: object, ser: serial.Serial) -> None:
+    scheduler(ser).cancel()
+
+
+class Interrupt(NamedTuple):
+    """a matcher which is also checked while input is still being sent
+
+    when it matches the queued input is cancelled before its action runs
+    """
+    matcher: Matcher
+
+    def __call__(self, frame: numpy.ndarray) -> bool:
+        return matches(self.matcher, frame)
+
+
 def do(*actions: Action) -> Action:
+    """run `actions` in turn
+
+    `Press`, `Write` and `Wait` queue their input and return.  any other
+    action first waits (rendering frames) for the input queued before it, so
+    e.g. a `Timeout.after` following a `Press` starts once it was sent.
+    input at the end is still being sent when `do` returns.
+    """
     def do_impl(vid: cv2.VideoCapture, ser: serial.Serial) -> None:
         for action in actions:
+            if not isinstance(action, (Press, Write, Wait)):
+                wait_and_render(vid, scheduler(ser).remaining())
             action(vid, ser)
     return do_impl
 
@@ -251,14 +1301,85 @@ class Write(NamedTuple):
     button: str
 
     def __call__(self, vid: cv2.VideoCapture, ser: serial.Serial) -> None:
-        ser.write(self.button.encode())
+        scheduler(ser).write(self.button.encode())
 
 
 class Wait(NamedTuple):
     d: float
 
     def __call__(self, vid: cv2.VideoCapture, ser: serial.Serial) -> None:
-        wait_and_render(vid, self.d)
+        wait_and_render(vid, scheduler(ser).remaining() + self.d)
+
+
+MACROS = bool(os.environ.get('MACROS'))
+MACRO_MAX_STEPS = 64
+MACRO_HOLD = 0
+MACRO_MAX_MS = 0xffff
+
+
+def compile_macro(*actions: Action) -> tuple[bytes, float] | None:
+    """compile to a firmware macro (see hw/switch/macro.h)
+
+    returns the packet and its duration or `None` if the actions cannot be
+    run on the device
+    """
+    steps: list[tuple[int, int]] = []
+
+    def _step(c: int, s: float) -> None:
+        ms = round(s * 1000)
+        if steps and c == MACRO_HOLD and steps[-1][1] < MACRO_MAX_MS:
+            prev_c, prev_ms = steps.pop()
+            extra = min(MACRO_MAX_MS - prev_ms, ms)
+            steps.append((prev_c, prev_ms + extra))
+            ms -= extra
+        while True:
+            steps.append((c, min(ms, MACRO_MAX_MS)))
+            ms -= MACRO_MAX_MS
+            c = MACRO_HOLD
+            if ms <= 0:
+                break
+
+    for action in actions:
+        if isinstance(action, Press) and len(action.button) == 1:
+            _step(ord(action.button), action.duration)
+            _step(ord('0'), .075)
+        elif isinstance(action, Write) and len(action.button) == 1:
+            _step(ord(action.button), 0)
+        elif isinstance(action, Wait):
+            _step(MACRO_HOLD, action.d)
+        else:
+            return None
+
+    if not steps or len(steps) > MACRO_MAX_STEPS:
+        return None
+
+    packet = bytearray(b'M')
+    packet.append(len(steps))
+    for c, ms in steps:
+        packet.append(c)
+        packet.extend(ms.to_bytes(2, 'little'))
+    return bytes(packet), sum(ms for _, ms in steps) / 1000
+
+
+def macro(*actions: Action) -> Action:
+    """like `do`, but sent as one packet and timed by the device
+
+    only `Press`, `Write` and `Wait` can be compiled.  this requires the
+    firmware to support macros so it is only enabled with `MACROS=1`
+    """
+    compiled = compile_macro(*actions)
+    if not MACROS or compiled is None:
+        return do(*actions)
+
+    packet, duration = compiled
+    blocks = any(isinstance(action, Wait) for action in actions)
+
+    def macro_impl(vid: cv2.VideoCapture, ser: serial.Serial) -> None:
+        print(f'macro steps={packet[1]} {duration=}')
+        scheduler(ser).write(packet, duration)
+        if blocks:  # like `do`, a `Wait` renders until the input is done
+            wait_and_render(vid, scheduler(ser).remaining())
+    return macro_impl
 
 
 class Timeout:
@@ -301,15 +1422,68 @@ class Counter:
 
 States = Mapping[str, tuple[tuple[Matcher, Action, str], ...]]
 
+PROFILE = os.environ.get('PROFILE', '')
+RECORD = os.environ.get('RECORD', '')
+RECORD_KEEP = float(os.environ.get('RECORD_KEEP', 600))
+
+
+def state_rois(states: States) -> dict[str, tuple[Roi, ...] | None]:
+    """the union of the regions read by each state's matchers
+
+    None for states with a matcher which does not declare what it reads
+    """
+    ret: dict[str, tuple[Roi, ...] | None] = {}
+    for state, transitions in states.items():
+        rois: list[Roi] | None = []
+        for matcher, _, _ in transitions:
+            matcher_rois = declared_rois(matcher)
+            if matcher_rois is None or rois is None:
+                rois = None
+            else:
+                rois.extend(r for r in matcher_rois if r not in rois)
+        ret[state] = None if rois is None else tuple(rois)
+    return ret
+
+
+def _profile_extra(states: States) -> dict[str, object]:
+    return {
+        'ocr_cache': {'hits': ocr_cache.hits, 'misses': ocr_cache.misses},
+        'rois': {
+            state: None if rois is None else [
+                [r.top_left, r.bottom_right] for r in rois
+            ]
+            for state, rois in state_rois(states).items()
+        },
+    }
 
-def run(
-        *,
-        vid: cv2.VideoCapture,
-        ser: serial.Serial,
-        initial: str,
-        states: States,
-        transition_timeout: int = 420,
-) -> NoReturn:
+
+def _timed(
+        profiler: Profiler | None,
+        name: str,
+) -> contextlib.AbstractContextManager[None]:
+    if profiler is None:
+        return contextlib.nullcontext()
+    else:
+        return profiler.timed(name)
+
+
+def _name(func: object) -> str:
+    qualname = getattr(func, '__qualname__', None)
+    if qualname is not None:
+        return qualname.rpartition('.')[2]
+    elif isinstance(func, tuple):  # Press(...), Wait(...), etc.
+        return repr(func)
+    else:
+        return type(func).__name__
+
+
+class Stalled(Exception):
+    def __init__(self, state: str) -> None:
+        super().__init__(f'stalled in state {state}')
+        self.state = state
+
+
+def _validate(initial: str, states: States) -> None:
     all_s = set(states)
     all_t = {
         t
@@ -323,20 +1497,159 @@ def run(
     if missing:
         raise AssertionError(f'missing states: {", ".join(missing)}')
 
-    t0 = time.monotonic()
-    state = initial
 
-    while True:
-        frame = getframe(vid)
+class Machine:
+    """the state machine of `run`, advanced one frame at a time by `step`
+
+    `step` raises `Stalled` if no transition happened for
+    `transition_timeout` seconds
+    """
+
+    def __init__(
+            self,
+            *,
+            vid: cv2.VideoCapture,
+            ser: serial.Serial,
+            initial: str,
+            states: States,
+            transition_timeout: int = 420,
+            profile: str = '',
+            recorder: Recorder | None = None,
+            name: str = '',
+    ) -> None:
+        _validate(initial, states)
+
+        self.vid = vid
+        self.ser = ser
+        self.states = states
+        self.transition_timeout = transition_timeout
+        self.name = name
+        self.state = initial
+        self.t0 = time.monotonic()
+
+        self.profiler = None
+        if profile:
+            self.profiler = Profiler(
+                profile,
+                extra=functools.partial(_profile_extra, states),
+            )
+            self.profiler.install()
+            self.profiler.enter(initial)
+
+        self.recorder = recorder
+        if recorder is not None:
+            recorder.state(self.t0, initial)
+
+        self._sched = scheduler(ser)
+        if recorder is not None:
+            self._sched.listeners.append(recorder.write)
+        _show_state(vid, initial)
+
+    def match(
+            self,
+            frame: numpy.ndarray,
+            *,
+            busy: bool,
+    ) -> tuple[int, Action, str] | None:
+        """the first transition of the current state which matches `frame`
+
+        while input is still being sent only `Interrupt`s are checked
+        """
+        for i, (matcher, action, new_state) in enumerate(
+                self.states[self.state],
+        ):
+            if busy and not isinstance(matcher, Interrupt):
+                continue
+
+            with _timed(self.profiler, f'matcher {i} {_name(matcher)}'):
+                matched = matches(matcher, frame)
+            if matched:
+                return i, action, new_state
+        return None
+
+    def step(self) -> None:
+        profiler = self.profiler
+
+        with _timed(profiler, 'getframe'):
+            frame = getframe(self.vid)
+        if profiler is not None:
+            profiler.frame()
+
+        busy = self._sched.busy()
+
+        if self.recorder is not None and isinstance(frame, Frame):
+            self.recorder.frame(
+                frame,
+                seq=frame.seq,
+                t=frame.t,
+                state=self.state,
+                busy=busy,
+            )
+
+        match = self.match(frame, busy=busy)
+        if match is not None:
+            i, action, new_state = match
+            if busy:
+                self._sched.cancel()
+            with _timed(profiler, f'action {i} {_name(action)}'):
+                action(self.vid, self.ser)
+            if new_state != self.state:
+                prefix = f'{self.name}: ' if self.name else ''
+                print(f'{prefix}=> {new_state}')
+                self.state = new_state
+                _show_state(self.vid, self.state)
+                if profiler is not None:
+                    profiler.enter(self.state)
+                self.t0 = time.monotonic()
+                if self.recorder is not None:
+                    self.recorder.state(self.t0, self.state)
+
+        if time.monotonic() > self.t0 + self.transition_timeout:
+            raise Stalled(self.state)
+
+
+_OVERRIDE_RUN: list[Callable[..., NoReturn]] = []
 
-        for matcher, action, new_state in states[state]:
-            if matcher(frame):
-                action(vid, ser)
-                if new_state != state:
-                    print(f'=> {new_state}')
-                    state = new_state
-                    t0 = time.monotonic()
-                break
 
-        if time.monotonic() > t0 + transition_timeout:
-            raise SystemExit(f'stalled in state {state}')
+def override_run(func: Callable[..., NoReturn]) -> None:
+    """make `run` call `func` instead (see `scripts.replay`)"""
+    _OVERRIDE_RUN[:] = [func]
+
+
+def run(
+        *,
+        vid: cv2.VideoCapture,
+        ser: serial.Serial,
+        initial: str,
+        states: States,
+        transition_timeout: int = 420,
+) -> NoReturn:
+    if _OVERRIDE_RUN:
+        _OVERRIDE_RUN[0](vid=vid, ser=ser, initial=initial, states=states)
+
+    recorder = None
+    if RECORD:
+        path = os.path.join(RECORD, time.strftime('%Y%m%d_%H%M%S'))
+        recorder = Recorder(path, keep=RECORD_KEEP)
+        atexit.register(recorder.close)
+        print(f'recording to {path}')
+
+    machine = Machine(
+        vid=vid,
+        ser=ser,
+        initial=initial,
+        states=states,
+        transition_timeout=transition_timeout,
+        profile=PROFILE,
+        recorder=recorder,
+    )
+    try:
+        while True:
+            machine.step()
+    except Stalled as e:
+        # the profile (if enabled) is written by the exit handler
+        raise SystemExit(str(e))
+    finally:
+        # do not exit with a button held by input which is still queued
+        if scheduler(ser).busy():
+            scheduler(ser).cancel()
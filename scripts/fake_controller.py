@@ -0,0 +1,217 @@
+"""a pty which behaves like the controller firmware
+
+(hw/switch, or hw/3ds-touch with --touch)
+
+use it in place of the real serial port to check what a script sends:
+
+    python -m scripts.fake_controller
+    python -m scripts.sv.raid --serial /dev/pts/N ...
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import select
+import threading
+import time
+import tty
+from collections.abc import Callable
+from typing import NamedTuple
+
+from scripts import protocol
+
+
+class Command(NamedTuple):
+    t: float
+    c: str
+    payload: bytes
+
+
+def _micros() -> int:
+    return time.monotonic_ns() // 1000 & 0xffffffff
+
+
+class FakeController:
+    def __init__(self, *, framed: bool = True, verbose: bool = False) -> None:
+        self.supports_framed = framed
+        self.verbose = verbose
+        self.framed = False
+        self.timing = False
+        self.commands: list[Command] = []
+        self.listeners: list[Callable[[Command], None]] = []
+        self.frames = 0
+        self.corrupt = 0
+        self._seq = protocol.NO_SEQ
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        self.port = os.ttyname(self._slave)
+
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> FakeController:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self._closing = True
+        self._thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _command(self, c: int, payload: bytes) -> None:
+        cmd = Command(t=time.monotonic(), c=chr(c), payload=payload)
+        self.commands.append(cmd)
+        if self.verbose:
+            print(f'{cmd.t:.3f} {cmd.c!r} {cmd.payload.hex()}')
+        for listener in self.listeners:
+            listener(cmd)
+
+    def _legacy(self, buf: bytes) -> bytes:
+        while (n := protocol.command_length(buf)) is not None:
+            c, payload, buf = buf[0], buf[1:n], buf[n:]
+            if c != protocol.PING:
+                self._command(c, payload)
+            elif self.supports_framed:
+                os.write(self._master, bytes((c, protocol.VERSION)))
+                self.framed = payload[0] == protocol.VERSION
+                if self.framed:
+                    self._seq = protocol.NO_SEQ
+                    return buf
+            else:  # old firmware does not know this command
+                self._command(c, b'')
+                buf = payload + buf
+        return buf
+
+    def _framed(self, msgs: list[protocol.Message]) -> None:
+        for msg in msgs:
+            self.frames += 1
+            if not msg.ok:
+                self.corrupt += 1
+                ack = protocol.NAK
+            else:
+                ack = protocol.ACK
+            os.write(self._master, protocol.encode(msg.seq, ack))
+
+            if not msg.ok or msg.seq == self._seq:
+                continue
+            self._seq = msg.seq
+
+            if msg.c == protocol.LEGACY:
+                self.framed = self.timing = False
+                self._seq = protocol.NO_SEQ
+            elif msg.c == protocol.TIMING:
+                self.timing = msg.payload == b'\x01'
+            elif msg.c != protocol.PING:
+                received = _micros()
+                self._command(msg.c, msg.payload)
+                if self.timing and msg.c != ord('M'):  # like the firmware
+                    payload = b''.join(
+                        n.to_bytes(4, 'little') for n in (received, _micros())
+                    )
+                    os.write(
+                        self._master,
+                        protocol.encode(msg.seq, protocol.TIMING, payload),
+                    )
+
+    def _run(self) -> None:
+        buf = b''
+        decoder = protocol.Decoder()
+        while not self._closing:
+            readable, _, _ = select.select((self._master,), (), (), .05)
+            if not readable:
+                continue
+            try:
+                bts = os.read(self._master, 1024)
+            except OSError:  # the other end is not open
+                time.sleep(.05)
+                continue
+
+            if self.framed:
+                self._framed(decoder.feed(bts))
+            else:
+                buf = self._legacy(buf + bts)
+                if self.framed:
+                    self._framed(decoder.feed(buf))
+                    buf = b''
+
+
+# touch positions of hw/3ds-touch
+_POS = 1 << 7
+_X = 1 << 6
+_HIGH = 1 << 5
+_MASK = _HIGH - 1
+
+
+class FakeTouchController(FakeController):
+    """behaves like the 3ds touch controller firmware
+
+    every byte is a command, except for touch positions which are collected
+    until a 't' (recorded with x and y as the payload) and 'p' which is
+    followed by its points (recorded as the payload)
+    """
+
+    def __init__(self, *, verbose: bool = False) -> None:
+        super().__init__(framed=False, verbose=verbose)
+        self.x = 0
+        self.y = 0
+
+    def _legacy(self, buf: bytes) -> bytes:
+        while buf:
+            c = buf[0]
+            if c == ord('p'):
+                if len(buf) < 2 or len(buf) < 2 + 5 * buf[1]:
+                    return buf
+                n = 2 + 5 * buf[1]
+                self._command(c, buf[1:n])
+                buf = buf[n:]
+                continue
+            buf = buf[1:]
+
+            if c & _POS:
+                shift = 5 if c & _HIGH else 0
+                value = (c & _MASK) << shift
+                if c & _X:
+                    self.x = self.x & ~(_MASK << shift) | value
+                else:
+                    self.y = self.y & ~(_MASK << shift) | value
+            elif c == ord('t'):
+                self._command(c, bytes((self.x >> 8, self.x & 0xff, self.y)))
+            else:
+                self._command(c, b'')
+        return b''
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--legacy',
+        action='store_true',
+        help='behave like firmware without the framed protocol',
+    )
+    parser.add_argument(
+        '--touch',
+        action='store_true',
+        help='behave like the 3ds touch controller',
+    )
+    args = parser.parse_args()
+
+    controller: FakeController
+    if args.touch:
+        controller = FakeTouchController(verbose=True)
+    else:
+        controller = FakeController(framed=not args.legacy, verbose=True)
+
+    with controller:
+        print(f'serial: {controller.port}')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -13,6 +13,7 @@ from scripts.engine import make_vid
 from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
+from scripts.engine import scheduler
 from scripts.engine import States
 from scripts.engine import Wait
 from scripts.thrids import alarm
@@ -43,9 +44,7 @@ def main() -> int:
     def tap(s: str) -> Action:
         def tap_impl(vid: cv2.VideoCapture, ser: serial.Serial) -> None:
             print(s, end='', flush=True)
-            ser.write(s.encode())
-            time.sleep(.04)
-            ser.write(b'0')
+            scheduler(ser).press(s.encode(), .04, gap=0)
             Wait(.05)(vid, ser)
         return tap_impl
 
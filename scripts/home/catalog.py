@@ -16,6 +16,7 @@ from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.switch import SERIAL_DEFAULT
 from scripts.thrids import region_colorish
@@ -98,7 +99,7 @@ def main() -> int:
         ),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
@@ -14,9 +14,14 @@ import numpy
 
 from scripts.engine import Color
 from scripts.engine import get_text
+from scripts.engine import get_texts
 from scripts.engine import match_px
 from scripts.engine import Point
 from scripts.engine import tessapi_int
+from scripts.templates import dhash
+from scripts.templates import HashIndex
+from scripts.templates import load_templates
+from scripts.templates import TemplateIndex
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 
@@ -56,51 +61,65 @@ class Pokemon(NamedTuple):
     els: Stats | None  # arceus
 
 
+UNKNOWN = 'unknown'
+
+
+def _unknown(kind: str, crop: numpy.ndarray, review: str | None) -> str:
+    if review is None:
+        cv2.imwrite(f'unknown-{kind}.png', crop)
+        raise AssertionError(f'unknown {kind}!')
+
+    os.makedirs(review, exist_ok=True)
+    filename = os.path.join(review, f'{kind}-{dhash(crop):016x}.png')
+    if not os.path.exists(filename):
+        print(f'unknown {kind}: {filename}')
+        cv2.imwrite(filename, crop)
+    return UNKNOWN
+
+
 @functools.lru_cache
-def icons() -> tuple[tuple[str, numpy.ndarray], ...]:
-    icons_dir = os.path.join(HERE, 'icons')
-    return tuple(
-        (name.split('.')[0], cv2.imread(os.path.join(icons_dir, name)))
-        for name in os.listdir(icons_dir)
+def icons() -> HashIndex:
+    return HashIndex(
+        *load_templates(os.path.join(HERE, 'icons'), 'home-icons'),
     )
 
 
-def get_icon(img: numpy.ndarray) -> str | None:
+def get_icon(img: numpy.ndarray, *, review: str | None = None) -> str | None:
     tl = Point(y=68, x=793).norm(img.shape)
     br = Point(y=107, x=844).norm(img.shape)
     icon = img[tl.y:br.y, tl.x:br.x]
 
-    for name, cand in icons():
-        if numpy.array_equal(icon, cand):
-            if name == 'none':
-                return None
-            else:
-                return name
+    name = icons().lookup(icon)
+    if name is None:
+        return _unknown('icon', icon, review)
+    elif name == 'none':
+        return None
     else:
-        cv2.imwrite('unknown-icon.png', icon)
-        raise AssertionError('unknown icon!')
+        return name
 
 
 @functools.lru_cache
-def balls() -> tuple[tuple[str, numpy.ndarray], ...]:
-    balls_dir = os.path.join(HERE, 'balls')
-    return tuple(
-        (name.split('.')[0], cv2.imread(os.path.join(balls_dir, name)))
-        for name in os.listdir(balls_dir)
+def balls() -> TemplateIndex:
+    # several balls are only a few bits of dhash apart, with only 20 of them
+    # every template is compared
+    return TemplateIndex(
+        *load_templates(os.path.join(HERE, 'balls'), 'home-balls'),
     )
 
 
-def get_ball(img: numpy.ndarray) -> str:
+def get_ball(img: numpy.ndarray, *, review: str | None = None) -> str:
     tl = Point(y=72, x=292).norm(img.shape)
     br = Point(y=102, x=328).norm(img.shape)
     ball = img[tl.y:br.y, tl.x:br.x]
+    if ball.shape != balls().shape:
+        h, w = balls().shape[:2]
+        ball = cv2.resize(ball, (w, h))
 
-    for name, cand in balls():
-        if numpy.array_equal(ball, cand):
-            return name
+    name = balls().match(ball, max_score=32, margin=.5)
+    if name is None:
+        return _unknown('ball', ball, review)
     else:
-        cv2.imwrite('unknown-ball.png', ball)
-        raise AssertionError('unknown ball!')
+        return name
 
 
 def get_region(img: numpy.ndarray) -> str:
@@ -124,59 +143,29 @@ def get_region(img: numpy.ndarray) -> str:
 
 
 def get_stats(img: numpy.ndarray) -> Stats:
-    hp_s = get_text(
-        img,
-        Point(y=197, x=230),
-        Point(y=217, x=287),
-        invert=False,
-        tessapi=tessapi_int(),
-    )
-    attack_s = get_text(
-        img,
-        Point(y=275, x=390),
-        Point(y=303, x=452),
-        invert=False,
-        tessapi=tessapi_int(),
-    )
-    defense_s = get_text(
-        img,
-        Point(y=442, x=390),
-        Point(y=470, x=456),
-        invert=False,
-        tessapi=tessapi_int(),
-    )
-    special_attack_s = get_text(
-        img,
-        Point(y=276, x=65),
-        Point(y=302, x=130),
-        invert=False,
-        tessapi=tessapi_int(),
-    )
-    special_defense_s = get_text(
+    hp_s, attack_s, defense_s, sp_attack_s, sp_defense_s, speed_s = get_texts(
         img,
-        Point(y=444, x=64),
-        Point(y=469, x=129),
-        invert=False,
-        tessapi=tessapi_int(),
-    )
-    speed_s = get_text(
-        img,
-        Point(y=464, x=231),
-        Point(y=486, x=294),
-        invert=False,
+        (
+            (Point(y=197, x=230), Point(y=217, x=287), False),
+            (Point(y=275, x=390), Point(y=303, x=452), False),
+            (Point(y=442, x=390), Point(y=470, x=456), False),
+            (Point(y=276, x=65), Point(y=302, x=130), False),
+            (Point(y=444, x=64), Point(y=469, x=129), False),
+            (Point(y=464, x=231), Point(y=486, x=294), False),
+        ),
         tessapi=tessapi_int(),
     )
     return Stats(
         hp=int(hp_s),
         attack=int(attack_s),
         defense=int(defense_s),
-        special_attack=int(special_attack_s),
-        special_defense=int(special_defense_s),
+        special_attack=int(sp_attack_s),
+        special_defense=int(sp_defense_s),
         speed=int(speed_s),
     )
 
 
-def parse_pokemon(filename: str) -> Pokemon:
+def parse_pokemon(filename: str, *, review: str | None = None) -> Pokemon:
     img = cv2.imread(filename)
 
     species_s = get_text(
@@ -241,11 +230,11 @@ def parse_pokemon(filename: str) -> Pokemon:
         invert=False,
     )
 
-    icon = get_icon(img)
+    icon = get_icon(img, review=review)
 
     region = get_region(img)
 
-    ball = get_ball(img)
+    ball = get_ball(img, review=review)
 
     stats = get_stats(img)
 
@@ -274,6 +263,13 @@ def parse_pokemon(filename: str) -> Pokemon:
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument('--imgs', default='home_screenshots')
+    parser.add_argument(
+        '--review',
+        help=(
+            'save unrecognized icons / balls here (recorded as '
+            f'{UNKNOWN!r}) instead of stopping'
+        ),
+    )
     args = parser.parse_args()
 
     max_filename = max(
@@ -287,7 +283,8 @@ def main() -> int:
 
     cpus = multiprocessing.cpu_count()
     with concurrent.futures.ProcessPoolExecutor(cpus) as exe:
-        ret = list(exe.map(parse_pokemon, fnames))
+        parse = functools.partial(parse_pokemon, review=args.review)
+        ret = list(exe.map(parse, fnames))
 
     create = '''\
 CREATE TABLE pokemon (
@@ -5,6 +5,7 @@ import time
 
 import serial
 
+from scripts.engine import Transport
 from scripts.switch import SERIAL_DEFAULT
 
 
@@ -102,7 +103,7 @@ def main() -> int:
     todo = args.box_count - args.offset
     offset = args.offset
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         while todo:
             if todo >= 3:
                 box_n = 3
@@ -0,0 +1,203 @@
+"""measure how long input takes to show up on screen
+
+each trial presses `--button` (and then `--revert` to undo it) and waits for
+the region to change.  the time is split into:
+
+- round trip: host write until the firmware's timing reply was read back
+- firmware: frame received until the usb report was sent
+- serial: host write until the frame was received (estimated, see below)
+- capture: usb report until the first captured frame showing the change
+- total: host write until the first captured frame showing the change
+
+the host only knows when the timing reply arrived, which is a whole usb
+round trip after the write (the usb serial adapter's latency timer can hold
+the reply back for up to 16ms).  each direction is estimated as half of the
+round trip without the firmware's time, so serial and capture are estimates
+but add up to the total with the firmware time.
+
+    python -m scripts.latency --button X --revert B
+
+`--fake` and `--video` replace the controller and capture card with
+`scripts.fake_controller` and a recording to try this without hardware (the
+numbers are then meaningless: the recording does not react to the input).
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import queue
+import time
+
+import cv2
+import numpy
+
+from scripts.engine import Capture
+from scripts.engine import crop
+from scripts.engine import Frame
+from scripts.engine import getframe
+from scripts.engine import InputTiming
+from scripts.engine import make_vid
+from scripts.engine import Point
+from scripts.engine import request_box
+from scripts.engine import Transport
+from scripts.engine import wait_and_render
+from scripts.fake_controller import FakeController
+from scripts.profiling import Timing
+from scripts.switch import SERIAL_DEFAULT
+
+
+def _point(s: str) -> Point:
+    y, x = s.split(',')
+    return Point(y=int(y), x=int(x))
+
+
+def _getframe(vid: cv2.VideoCapture) -> Frame | None:
+    frame = getframe(vid)
+    assert frame is None or isinstance(frame, Frame)
+    return frame
+
+
+def _changed(
+        frame: numpy.ndarray,
+        baseline: numpy.ndarray,
+        tl: Point,
+        br: Point,
+        threshold: float,
+) -> bool:
+    diff = cv2.absdiff(crop(frame, tl, br), baseline)
+    return float(diff.mean()) > threshold
+
+
+def _timing(ser: Transport, t0: float) -> InputTiming | None:
+    while True:
+        try:
+            timing = ser.timings.get(timeout=1)
+        except queue.Empty:
+            return None
+        if timing.written >= t0:
+            return timing
+
+
+def measure(
+        vid: Capture,
+        ser: Transport,
+        *,
+        tl: Point,
+        br: Point,
+        buttons: tuple[str, ...],
+        count: int,
+        threshold: float,
+        timeout: float,
+        settle: float,
+) -> dict[str, Timing]:
+    timings = {
+        'round trip': Timing(),
+        'firmware': Timing(),
+        'serial': Timing(),
+        'capture': Timing(),
+        'total': Timing(),
+    }
+
+    ser.timing(True)
+    try:
+        for i in range(count):
+            for button in buttons:
+                wait_and_render(vid, settle)
+                frame = _getframe(vid)
+                if frame is None:
+                    return timings
+                baseline = crop(frame, tl, br).copy()
+
+                t0 = time.monotonic()
+                ser.write(button.encode())
+                seen = None
+                while time.monotonic() < t0 + timeout:
+                    frame = _getframe(vid)
+                    if frame is None:
+                        return timings
+                    elif (
+                            frame.t >= t0 and
+                            _changed(frame, baseline, tl, br, threshold)
+                    ):
+                        seen = frame.t
+                        break
+                ser.write(b'0')
+
+                timing = _timing(ser, t0)
+                if seen is None or timing is None:
+                    print(f'{i=} {button=}: no change seen')
+                    continue
+                round_trip = timing.reported - timing.written
+                leg = max(round_trip - timing.firmware, 0) / 2
+                timings['round trip'].add(round_trip)
+                timings['firmware'].add(timing.firmware)
+                timings['serial'].add(leg)
+                timings['capture'].add(seen - (timing.reported - leg))
+                timings['total'].add(seen - t0)
+                print(f'{i=} {button=}: {(seen - t0) * 1000:.1f}ms')
+    finally:
+        ser.timing(False)
+
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--serial', default=SERIAL_DEFAULT)
+    parser.add_argument('--fake', action='store_true')
+    parser.add_argument('--video', help='use a recording instead of capture')
+    parser.add_argument('--button', default='X')
+    parser.add_argument('--revert', default='B')
+    parser.add_argument('--count', type=int, default=20)
+    parser.add_argument('--tl', type=_point, help='region as y,x')
+    parser.add_argument('--br', type=_point, help='region as y,x')
+    parser.add_argument('--threshold', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=2)
+    parser.add_argument('--settle', type=float, default=1)
+    parser.add_argument('--json', help='also write the summary here')
+    args = parser.parse_args()
+
+    vid = Capture(args.video) if args.video else make_vid()
+    if args.tl is not None and args.br is not None:
+        tl, br = args.tl, args.br
+    else:
+        tl, br = request_box(vid)
+
+    with contextlib.ExitStack() as ctx:
+        if args.fake:
+            port = ctx.enter_context(FakeController()).port
+        else:
+            port = args.serial
+        ser = Transport(port)
+        ctx.enter_context(ser)
+
+        timings = measure(
+            vid,
+            ser,
+            tl=tl,
+            br=br,
+            buttons=(args.button, args.revert),
+            count=args.count,
+            threshold=args.threshold,
+            timeout=args.timeout,
+            settle=args.settle,
+        )
+
+    summary = {k: v.summary() for k, v in timings.items()}
+    for k, v in summary.items():
+        print(
+            f'{k:>10}: n={v["count"]} '
+            f'p50={v["p50"] * 1000:.1f}ms '
+            f'p95={v["p95"] * 1000:.1f}ms '
+            f'max={v["max"] * 1000:.1f}ms',
+        )
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import argparse
-import time
 
 import cv2
 import numpy
@@ -18,8 +17,10 @@ from scripts.engine import match_text
 from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
+from scripts.engine import scheduler
 from scripts.engine import States
 from scripts.engine import Timeout
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.switch import alarm
 from scripts.switch import game_start
@@ -52,9 +53,7 @@ def main() -> int:
     def press(s: str) -> Action:
         def press_impl(vid: object, ser: serial.Serial) -> None:
             print(s, end='', flush=True)
-            ser.write(s.encode())
-            time.sleep(.1)
-            ser.write(b'.')
+            scheduler(ser).press(s.encode(), .1, release=b'.', gap=0)
         return press_impl
 
     def nl(vid: object, ser: object) -> None:
@@ -103,7 +102,7 @@ def main() -> int:
         **alarm('ALARM', quiet=args.quiet),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
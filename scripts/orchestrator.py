@@ -0,0 +1,197 @@
+"""run the state machines of several consoles in one process
+
+    orchestrate((
+        Console(
+            name='left',
+            vid=make_vid(0, preview=False),
+            ser=Transport('/dev/ttyUSB0'),
+            initial='INITIAL',
+            states=states_left,
+        ),
+        ...
+    ))
+
+each console runs on its own thread with its own capture device and serial
+port.  the ocr pool and caches of `scripts.engine` are shared.  a single
+window (or, with NOSHOW=1, the terminal) shows the status of all consoles.
+
+a console which stalls is stopped (and its input released) without
+affecting the others.  with PROFILE=profile.json each console's profile is
+written to profile.<name>.json and with RECORD=dir each console's session is
+recorded to dir/<time>/<name>.
+"""
+from __future__ import annotations
+
+import atexit
+import math
+import os.path
+import threading
+import time
+import traceback
+from collections.abc import Sequence
+from typing import NamedTuple
+
+import cv2
+import numpy
+import serial
+
+from scripts.engine import Capture
+from scripts.engine import Machine
+from scripts.engine import PROFILE
+from scripts.engine import RECORD
+from scripts.engine import RECORD_KEEP
+from scripts.engine import scheduler
+from scripts.engine import SHOW
+from scripts.engine import SHOW_FPS
+from scripts.engine import Stalled
+from scripts.engine import States
+from scripts.recording import Recorder
+
+
+class Console(NamedTuple):
+    name: str
+    vid: cv2.VideoCapture
+    ser: serial.Serial
+    initial: str
+    states: States
+    transition_timeout: int = 420
+
+
+_STARTED = time.strftime('%Y%m%d_%H%M%S')
+
+
+def _recorder(name: str) -> Recorder | None:
+    if not RECORD:
+        return None
+    recorder = Recorder(
+        os.path.join(RECORD, _STARTED, name),
+        keep=RECORD_KEEP,
+    )
+    atexit.register(recorder.close)
+    return recorder
+
+
+def _profile(name: str) -> str:
+    if not PROFILE:
+        return ''
+    base, ext = os.path.splitext(PROFILE)
+    return f'{base}.{name}{ext}'
+
+
+class _Worker:
+    def __init__(self, console: Console, stop: threading.Event) -> None:
+        self.console = console
+        self.stop = stop
+        self.status = 'running'
+        self.machine = Machine(
+            vid=console.vid,
+            ser=console.ser,
+            initial=console.initial,
+            states=console.states,
+            transition_timeout=console.transition_timeout,
+            profile=_profile(console.name),
+            recorder=_recorder(console.name),
+            name=console.name,
+        )
+        self.thread = threading.Thread(
+            target=self._run,
+            name=console.name,
+            daemon=True,
+        )
+
+    def _run(self) -> None:
+        try:
+            while not self.stop.is_set():
+                self.machine.step()
+            self.status = 'stopped'
+        except Stalled as e:
+            self.status = str(e)
+        except SystemExit as e:  # `bye`
+            self.status = f'exited: {e.code}' if e.code else 'done'
+        except Exception as e:
+            traceback.print_exc()
+            self.status = f'error: {e!r}'
+        finally:
+            scheduler(self.console.ser).cancel()
+
+
+_TILE_W, _TILE_H = 640, 360
+
+
+def _tile(worker: _Worker) -> numpy.ndarray:
+    vid = worker.console.vid
+    frame = vid.latest() if isinstance(vid, Capture) else None
+    img: numpy.ndarray
+    if frame is None:
+        img = numpy.zeros((_TILE_H, _TILE_W, 3), dtype=numpy.uint8)
+    else:
+        img = cv2.resize(frame, (_TILE_W, _TILE_H))
+
+    lines = (
+        f'{worker.console.name}: {worker.machine.state}',
+        worker.status,
+    )
+    for i, line in enumerate(lines):
+        for color, thickness in ((0, 4), (255, 1)):
+            cv2.putText(
+                img,
+                line,
+                (10, 30 + 30 * i),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                .75,
+                (color, color, color),
+                thickness,
+            )
+    return img
+
+
+def _status_image(workers: Sequence[_Worker]) -> numpy.ndarray:
+    cols = math.ceil(math.sqrt(len(workers)))
+    tiles = [_tile(worker) for worker in workers]
+    blank = numpy.zeros_like(tiles[0])
+    tiles.extend(blank for _ in range(-len(tiles) % cols))
+    rows = [
+        numpy.hstack(tiles[i:i + cols])
+        for i in range(0, len(tiles), cols)
+    ]
+    return numpy.vstack(rows)
+
+
+def _report(workers: Sequence[_Worker], statuses: dict[str, str]) -> None:
+    for worker in workers:
+        if worker.status != statuses[worker.console.name]:
+            statuses[worker.console.name] = worker.status
+            print(f'{worker.console.name}: {worker.status}')
+
+
+def orchestrate(
+        consoles: Sequence[Console],
+        *,
+        show: bool = SHOW,
+) -> dict[str, str]:
+    """run until every console is done, returns the status of each"""
+    names = [console.name for console in consoles]
+    if len(set(names)) != len(names):
+        raise ValueError(f'console names must be unique: {names}')
+
+    stop = threading.Event()
+    workers = [_Worker(console, stop) for console in consoles]
+    for worker in workers:
+        worker.thread.start()
+
+    statuses = {worker.console.name: worker.status for worker in workers}
+    try:
+        while any(worker.thread.is_alive() for worker in workers):
+            _report(workers, statuses)
+            if show:
+                cv2.imshow('consoles', _status_image(workers))
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    stop.set()
+            time.sleep(1 / SHOW_FPS)
+    except KeyboardInterrupt:
+        stop.set()
+
+    for worker in workers:
+        worker.thread.join()
+    _report(workers, statuses)
+    return statuses
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import atexit
+import collections
+import contextlib
+import json
+import signal
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Generator
+from typing import Any
+
+
+class Timing:
+    """durations of one kind of work, keeping the most recent samples"""
+
+    def __init__(self, samples: int = 10000) -> None:
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+        self.samples: collections.deque[float]
+        self.samples = collections.deque(maxlen=samples)
+
+    def add(self, dt: float) -> None:
+        self.count += 1
+        self.total += dt
+        self.max = max(self.max, dt)
+        self.samples.append(dt)
+
+    def summary(self) -> dict[str, float]:
+        samples = sorted(self.samples)
+        return {
+            'count': self.count,
+            'total': self.total,
+            'p50': samples[len(samples) // 2] if samples else 0.,
+            'p95': samples[int(len(samples) * .95)] if samples else 0.,
+            'max': self.max,
+        }
+
+
+class StateProfile:
+    def __init__(self) -> None:
+        self.frames = 0
+        self.time = 0.
+        self.timings: collections.defaultdict[str, Timing]
+        self.timings = collections.defaultdict(Timing)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            'frames': self.frames,
+            'time': self.time,
+            'fps': self.frames / self.time if self.time else 0.,
+            'timings': {k: v.summary() for k, v in self.timings.items()},
+        }
+
+
+class Profiler:
+    """per-state timings of `engine.run`, written as json to `path`
+
+    the report is written at exit (including when a state stalls) and
+    whenever the process receives SIGUSR1.  timings may be added from any
+    thread.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            *,
+            extra: Callable[[], dict[str, Any]] = dict,
+    ) -> None:
+        self.path = path
+        self.extra = extra
+        self.t0 = time.monotonic()
+        self.states: collections.defaultdict[str, StateProfile]
+        self.states = collections.defaultdict(StateProfile)
+
+        self._state = ''
+        self._state_t = self.t0
+        # reentrant: the SIGUSR1 handler may interrupt the main thread in here
+        self._lock = threading.RLock()
+
+    def install(self) -> None:
+        atexit.register(self.dump)
+        if (
+                hasattr(signal, 'SIGUSR1') and
+                threading.current_thread() is threading.main_thread()
+        ):
+            prev = signal.getsignal(signal.SIGUSR1)
+
+            def handler(*args: Any) -> None:
+                self.dump()
+                if callable(prev):
+                    prev(*args)
+
+            signal.signal(signal.SIGUSR1, handler)
+
+    def enter(self, state: str) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._state:
+                self.states[self._state].time += now - self._state_t
+            self._state = state
+            self._state_t = now
+
+    def frame(self) -> None:
+        with self._lock:
+            self.states[self._state].frames += 1
+
+    @contextlib.contextmanager
+    def timed(self, name: str) -> Generator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, dt: float) -> None:
+        with self._lock:
+            self.states[self._state].timings[name].add(dt)
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            self.enter(self._state)  # account time in the current state
+            return {
+                'elapsed': time.monotonic() - self.t0,
+                'state': self._state,
+                'states': {k: v.summary() for k, v in self.states.items()},
+                **self.extra(),
+            }
+
+    def dump(self) -> None:
+        with open(self.path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+            f.write('\n')
+        print(f'profile written to {self.path}')
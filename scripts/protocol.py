@@ -0,0 +1,94 @@
+"""the serial protocols of the switch controller (see hw/switch/protocol.h)"""
+from __future__ import annotations
+
+import functools
+import operator
+from typing import NamedTuple
+
+LEGACY_BAUD = 9600
+
+VERSION = 1
+BAUD = 250000
+SYNC = 0xa5
+NO_SEQ = 0
+ACK = ord('a')
+NAK = ord('n')
+PING = ord('P')
+LEGACY = ord('p')
+TIMING = ord('T')
+
+
+_PAYLOAD = {ord('<'): 2, ord('>'): 2, ord('P'): 1, ord('S'): 7}
+
+
+def command_length(bts: bytes) -> int | None:
+    """length of the legacy command at the start of `bts`
+
+    returns `None` if `bts` does not contain the whole command yet
+    """
+    if not bts:
+        return None
+    elif bts[0] == ord('M'):
+        n = 2 + 3 * bts[1] if len(bts) >= 2 else 2
+    else:
+        n = 1 + _PAYLOAD.get(bts[0], 0)
+    return n if len(bts) >= n else None
+
+
+def split_commands(bts: bytes) -> list[tuple[int, bytes]]:
+    """split legacy commands into (command, payload)"""
+    ret = []
+    while bts:
+        n = command_length(bts)
+        if n is None:
+            raise ValueError(f'incomplete command: {bts!r}')
+        ret.append((bts[0], bts[1:n]))
+        bts = bts[n:]
+    return ret
+
+
+def checksum(bts: bytes) -> int:
+    return functools.reduce(operator.xor, bts, 0)
+
+
+def next_seq(seq: int) -> int:
+    """the sequence number after `seq`, skipping `NO_SEQ`"""
+    return seq % 255 + 1
+
+
+def encode(seq: int, c: int, payload: bytes = b'') -> bytes:
+    body = bytes((len(payload), seq, c)) + payload
+    return bytes((SYNC,)) + body + bytes((checksum(body),))
+
+
+class Message(NamedTuple):
+    seq: int
+    c: int
+    payload: bytes
+    ok: bool
+
+
+class Decoder:
+    """incrementally decodes frames from a byte stream"""
+
+    def __init__(self) -> None:
+        self._buf = b''
+
+    def feed(self, bts: bytes) -> list[Message]:
+        self._buf += bts
+        ret = []
+        while True:
+            start = self._buf.find(SYNC)
+            if start == -1:
+                self._buf = b''
+                break
+            buf = self._buf = self._buf[start:]
+            if len(buf) < 2 or len(buf) < 5 + buf[1]:
+                break
+
+            n, seq, c = buf[1:4]
+            payload = buf[4:4 + n]
+            ok = buf[4 + n] == checksum(buf[1:4 + n])
+            ret.append(Message(seq=seq, c=c, payload=payload, ok=ok))
+            self._buf = buf[5 + n:]
+        return ret
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import collections
+import json
+import os
+import queue
+import threading
+from typing import Any
+from typing import NamedTuple
+
+import cv2
+import numpy
+
+
+class FrameEvent(NamedTuple):
+    seq: int
+    t: float
+    state: str
+    busy: bool
+    path: str
+
+
+class Recorder:
+    """records a session of `engine.run` to the directory `path`
+
+    `events.jsonl` has every evaluated frame (with the state it was evaluated
+    in), serial write and state transition.  frames are stored losslessly as
+    `frames/<seq>.png`, only the ones from the last `keep` seconds are kept.
+
+    at most `max_pending` frames wait to be written, further frames are
+    dropped: each frame event has the number dropped since the previous one
+    and the last line of `events.jsonl` has the total.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            *,
+            keep: float,
+            max_pending: int = 32,
+    ) -> None:
+        self.path = path
+        self.keep = keep
+        self.dropped = 0
+        os.makedirs(os.path.join(path, 'frames'))
+        self._events = open(os.path.join(path, 'events.jsonl'), 'w')
+        self._frames: collections.deque[tuple[float, str]]
+        self._frames = collections.deque()
+        self._dropped_since = 0
+        # bounds the queued frame copies only: writes and state transitions
+        # are small and must neither be dropped nor block the input thread
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._queue: queue.Queue[
+            tuple[dict[str, Any], numpy.ndarray | None] | None
+        ] = queue.Queue()
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def _write(self) -> None:
+        while (item := self._queue.get()) is not None:
+            event, img = item
+            if img is not None:
+                cv2.imwrite(
+                    os.path.join(self.path, event['path']),
+                    img,
+                    (cv2.IMWRITE_PNG_COMPRESSION, 1),
+                )
+                self._pending.release()
+                self._frames.append((event['t'], event['path']))
+                while self._frames[0][0] < event['t'] - self.keep:
+                    _, old = self._frames.popleft()
+                    os.remove(os.path.join(self.path, old))
+
+            self._events.write(f'{json.dumps(event)}\n')
+            self._events.flush()
+
+    def frame(
+            self,
+            frame: numpy.ndarray,
+            *,
+            seq: int,
+            t: float,
+            state: str,
+            busy: bool,
+    ) -> None:
+        if not self._pending.acquire(blocking=False):
+            self.dropped += 1
+            self._dropped_since += 1
+            return
+
+        path = f'frames/{seq:08d}.png'
+        event = {
+            'type': 'frame',
+            'seq': seq,
+            't': t,
+            'state': state,
+            'busy': busy,
+            'path': path,
+            'dropped': self._dropped_since,
+        }
+        self._dropped_since = 0
+        self._queue.put((event, numpy.array(frame)))
+
+    def write(self, t: float, bts: bytes) -> None:
+        self._queue.put(({'type': 'write', 't': t, 'data': bts.hex()}, None))
+
+    def state(self, t: float, state: str) -> None:
+        self._queue.put(({'type': 'state', 't': t, 'state': state}, None))
+
+    def close(self) -> None:
+        self._queue.put(({'type': 'dropped', 'frames': self.dropped}, None))
+        self._queue.put(None)
+        self._thread.join()
+        self._events.close()
+
+
+def load_frames(path: str) -> list[FrameEvent]:
+    """the recorded frames in order (the images of old ones may be gone)"""
+    ret = []
+    with open(os.path.join(path, 'events.jsonl')) as f:
+        for line in f:
+            event = json.loads(line)
+            if event['type'] == 'frame':
+                ret.append(
+                    FrameEvent(
+                        seq=event['seq'],
+                        t=event['t'],
+                        state=event['state'],
+                        busy=event['busy'],
+                        path=os.path.join(path, event['path']),
+                    ),
+                )
+    return ret
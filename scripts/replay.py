@@ -0,0 +1,160 @@
+"""replay a recorded session through a script's states
+
+    RECORD=sessions python -m scripts.sv.hatch --boxes 1
+    python -m scripts.replay sessions/YYYYmmdd_HHMMSS scripts.sv.hatch ...
+
+every recorded frame is evaluated in the state it was recorded in and the
+transition which matches is compared with the one which was recorded.
+actions are not run (nothing is sent to the controller), so matchers which
+depend on state changed by actions (such as counters) may disagree.
+
+`--speed max` (default) evaluates frames as fast as possible, which doubles as
+a benchmark of the matchers (combine with PROFILE=...).  `--speed original`
+keeps the recorded timing.
+"""
+from __future__ import annotations
+
+import argparse
+import os.path
+import runpy
+import sys
+import time
+from typing import NoReturn
+
+import cv2
+import serial
+
+from scripts.engine import Capture
+from scripts.engine import Frame
+from scripts.engine import Machine
+from scripts.engine import override_run
+from scripts.engine import override_vid
+from scripts.engine import PROFILE
+from scripts.engine import States
+from scripts.fake_controller import FakeController
+from scripts.recording import FrameEvent
+from scripts.recording import load_frames
+
+
+class ReplayCapture(Capture):
+    """returns every recorded frame, in order"""
+
+    def __init__(self, path: str, *, realtime: bool) -> None:
+        super().__init__()
+        self.realtime = realtime
+        self.events = [
+            event for event in load_frames(path)
+            if os.path.exists(event.path)
+        ]
+        self.event: FrameEvent | None = None
+        self._i = 0
+        self._start_t = 0.
+
+    def isOpened(self) -> bool:
+        return True
+
+    def read(  # type: ignore[override]
+            self,
+            image: object = None,
+    ) -> tuple[bool, Frame | None]:
+        if self._i >= len(self.events):
+            return False, None
+        self.event = event = self.events[self._i]
+        self._i += 1
+
+        if self.realtime:
+            if self._i == 1:
+                self._start_t = time.monotonic() - event.t
+            time.sleep(max(self._start_t + event.t - time.monotonic(), 0))
+
+        img = cv2.imread(event.path)
+        if img is None:
+            raise ValueError(f'could not read {event.path}')
+        frame = img.view(Frame)
+        frame.seq = event.seq
+        frame.t = event.t
+        return True, frame
+
+
+def _next_states(path: str) -> dict[int, str]:
+    """the state recorded after each frame (keyed by frame seq)"""
+    events = load_frames(path)
+    return {
+        event.seq: next_event.state
+        for event, next_event in zip(events, events[1:])
+    }
+
+
+def _replay(machine: Machine, *, vid: ReplayCapture, path: str) -> int:
+    expected = _next_states(path)
+    profiler = machine.profiler
+
+    frames = diverged = 0
+    t0 = time.monotonic()
+    while True:
+        ret, frame = vid.read()
+        if not ret or frame is None:
+            break
+        assert vid.event is not None
+        frames += 1
+
+        if vid.event.state != machine.state:
+            machine.state = vid.event.state
+            if profiler is not None:
+                profiler.enter(machine.state)
+        if profiler is not None:
+            profiler.frame()
+
+        match = machine.match(frame, busy=vid.event.busy)
+        new_state = machine.state if match is None else match[2]
+        recorded = expected.get(frame.seq)
+        if recorded is not None and recorded != new_state:
+            diverged += 1
+            print(
+                f'frame {frame.seq} in {machine.state}: '
+                f'replay => {new_state}, recorded => {recorded}',
+            )
+
+    elapsed = time.monotonic() - t0
+    fps = frames / elapsed if elapsed else 0
+    print(f'replayed {frames} frames ({fps:.1f} fps), {diverged} diverged')
+    return 1 if diverged else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('session')
+    parser.add_argument('module')
+    parser.add_argument('--speed', choices=('max', 'original'), default='max')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    capture = ReplayCapture(args.session, realtime=args.speed == 'original')
+
+    def replay_run(
+            *,
+            vid: cv2.VideoCapture,
+            ser: serial.Serial,
+            initial: str,
+            states: States,
+    ) -> NoReturn:
+        assert isinstance(vid, ReplayCapture)
+        machine = Machine(
+            vid=vid,
+            ser=ser,
+            initial=initial,
+            states=states,
+            profile=PROFILE,
+        )
+        raise SystemExit(_replay(machine, vid=vid, path=args.session))
+
+    with FakeController() as controller:
+        override_vid(capture)
+        override_run(replay_run)
+        sys.argv = [args.module, '--serial', controller.port, *args.args]
+        runpy.run_module(args.module, run_name='__main__')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
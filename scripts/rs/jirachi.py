@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import argparse
-import time
 
 import cv2
 import numpy
@@ -14,9 +13,12 @@ from scripts.engine import do
 from scripts.engine import make_vid
 from scripts.engine import match_px
 from scripts.engine import match_text
+from scripts.engine import PixelBank
 from scripts.engine import Point
 from scripts.engine import Press
+from scripts.engine import Px
 from scripts.engine import run
+from scripts.engine import scheduler
 from scripts.engine import States
 from scripts.engine import Timeout
 from scripts.engine import Wait
@@ -26,9 +28,7 @@ from scripts.thrids import SERIAL_DEFAULT
 
 def _bootup(start: str, end: str) -> States:
     def _a(vid: object, ser: serial.Serial) -> None:
-        ser.write(b'A')
-        time.sleep(.05)
-        ser.write(b'.')
+        scheduler(ser).press(b'A', .05, release=b'.', gap=0)
         print('A', end='', flush=True)
 
     def nl(vid: object, ser: object) -> None:
@@ -37,10 +37,10 @@ def _bootup(start: str, end: str) -> States:
     return {
         start: (
             (
-                all_match(
-                    match_px(Point(y=421, x=997), Color(b=40, g=68, r=255)),
-                    match_px(Point(y=88, x=876), Color(b=245, g=96, r=93)),
-                    match_px(Point(y=114, x=1130), Color(b=245, g=96, r=93)),
+                PixelBank(
+                    Px(Point(y=421, x=997), (Color(b=40, g=68, r=255),)),
+                    Px(Point(y=88, x=876), (Color(b=245, g=96, r=93),)),
+                    Px(Point(y=114, x=1130), (Color(b=245, g=96, r=93),)),
                 ),
                 nl,
                 end,
@@ -70,11 +70,8 @@ def main() -> int:
         return count != total
 
     def _confirm(vid: object, ser: serial.Serial) -> None:
-        ser.write(b'A')
-        time.sleep(.05)
-        ser.write(b'*')
-        time.sleep(.25)
-        ser.write(b'.')
+        scheduler(ser).write(b'A', .05)
+        scheduler(ser).press(b'*', .25, release=b'.', gap=0)
 
     states: States = {
         'INITIAL': (
@@ -128,8 +125,13 @@ def main() -> int:
         'CORRUPT_CONFIRM': (
             (
                 all_match(
-                    match_px(Point(y=64, x=586), Color(b=125, g=79, r=11)),
-                    match_px(Point(y=109, x=332), Color(b=255, g=255, r=255)),
+                    PixelBank(
+                        Px(Point(y=64, x=586), (Color(b=125, g=79, r=11),)),
+                        Px(
+                            Point(y=109, x=332),
+                            (Color(b=255, g=255, r=255),),
+                        ),
+                    ),
                     match_text(
                         'all save',
                         Point(y=526, x=295),
@@ -0,0 +1,157 @@
+"""run a script against a virtual console
+
+    python -m scripts.sim SCREENS scripts.sv.hatch --boxes 1
+
+`SCREENS` is a directory of screenshots (`<screen>.png`) and a `model.json`
+describing how the screen changes with the input:
+
+    {
+        "firmware": "switch",
+        "initial": "title",
+        "transitions": {
+            "title": {"A": "loading"},
+            "loading": {"": ["world", 2.5]},
+            "world": {"X": "menu", "t": ["map", 0.5]}
+        }
+    }
+
+each transition is keyed on the command received by the controller ("" for a
+transition which happens by itself) and goes to a screen, optionally after a
+delay in seconds.  "firmware" is "switch" (default) or "3ds-touch".
+
+the script is run with `--serial` pointing at the fake controller and
+`make_vid()` returning the virtual capture.  `--fps 0` produces frames as fast
+as the script reads them, which is useful to benchmark its throughput.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os.path
+import runpy
+import sys
+import threading
+import time
+from typing import Any
+
+import cv2
+import numpy
+
+from scripts.engine import Capture
+from scripts.engine import Frame
+from scripts.engine import override_vid
+from scripts.fake_controller import Command
+from scripts.fake_controller import FakeController
+from scripts.fake_controller import FakeTouchController
+
+
+class SimCapture(Capture):
+    """frames from a directory of screenshots, following a transition model"""
+
+    def __init__(self, directory: str, *, fps: float = 30) -> None:
+        super().__init__()
+        self.directory = directory
+        self.fps = fps
+        with open(os.path.join(directory, 'model.json')) as f:
+            self.model: dict[str, Any] = json.load(f)
+
+        self.screen = self.model['initial']
+        self._images: dict[str, numpy.ndarray] = {}
+        self._lock = threading.Lock()
+        self._next: tuple[float, str] | None = None
+        self._enter(self.screen, time.monotonic())
+        self._last = 0.
+
+    def isOpened(self) -> bool:
+        return True
+
+    def _image(self, screen: str) -> numpy.ndarray:
+        if screen not in self._images:
+            path = os.path.join(self.directory, f'{screen}.png')
+            img = cv2.imread(path)
+            if img is None:
+                raise ValueError(f'could not read {path}')
+            self._images[screen] = img
+        return self._images[screen]
+
+    def _transition(self, key: str, t: float) -> None:
+        target = self.model['transitions'].get(self.screen, {}).get(key)
+        if target is None:
+            return
+        elif isinstance(target, str):
+            self._next = (t, target)
+        else:
+            screen, delay = target
+            self._next = (t + delay, screen)
+
+    def _enter(self, screen: str, t: float) -> None:
+        self.screen = screen
+        self._next = None
+        self._transition('', t)
+
+    def on_command(self, cmd: Command) -> None:
+        with self._lock:
+            self._transition(cmd.c, cmd.t)
+
+    def _read_raw(self) -> tuple[bool, numpy.ndarray]:
+        if self.fps > 0:
+            self._last = max(self._last + 1 / self.fps, time.monotonic())
+            time.sleep(max(self._last - time.monotonic(), 0))
+
+        with self._lock:
+            now = time.monotonic()
+            while self._next is not None and self._next[0] <= now:
+                self._enter(self._next[1], self._next[0])
+            return True, self._image(self.screen).copy()
+
+    # with fps 0 frames are rendered by `read` itself: a background thread
+    # would spin copying frames which nothing reads
+
+    def latest(self) -> Frame | None:
+        if self.fps > 0:
+            return super().latest()
+        with self._cond:
+            return self._frame
+
+    def read(  # type: ignore[override]
+            self,
+            image: object = None,
+    ) -> tuple[bool, Frame | None]:
+        if self.fps > 0:
+            return super().read(image)
+        _, img = self._read_raw()
+        with self._cond:
+            self._seen += 1
+            self._frame = self._to_frame(img, self._seen)
+            return True, self._frame
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('screens')
+    parser.add_argument('module')
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    vid = SimCapture(args.screens, fps=args.fps)
+
+    controller: FakeController
+    if vid.model.get('firmware', 'switch') == '3ds-touch':
+        controller = FakeTouchController()
+    else:
+        controller = FakeController()
+    controller.listeners.append(vid.on_command)
+
+    with controller:
+        override_vid(vid)
+        sys.argv = [args.module, '--serial', controller.port, *args.args]
+        try:
+            runpy.run_module(args.module, run_name='__main__')
+        finally:
+            print(f'sim: {len(controller.commands)} commands')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
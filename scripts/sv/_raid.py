@@ -15,8 +15,11 @@ from scripts.engine import match_text
 from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import States
+from scripts.engine import to_hsv
 from scripts.engine import Wait
 from scripts.sv._bootup import world
+from scripts.templates import load_templates
+from scripts.templates import TemplateIndex
 
 _HERE = os.path.dirname(os.path.abspath(__file__))
 
@@ -25,6 +28,7 @@ raid_appeared = match_text(
     Point(y=97, x=179),
     Point(y=129, x=333),
     invert=False,
+    signature=True,
 )
 
 raid_communication_error = any_match(
@@ -33,30 +37,35 @@ raid_communication_error = any_match(
         Point(y=239, x=329),
         Point(y=276, x=614),
         invert=True,
+        signature=True,
     ),
     match_text(
         'Please try again later.',
         Point(y=362, x=272),
         Point(y=397, x=1012),
         invert=True,
+        signature=True,
     ),
     match_text(
         'Please start again from the beginning.',
         Point(y=355, x=388),
         Point(y=385, x=861),
         invert=True,
+        signature=True,
     ),
     match_text(
         'Communication with the other Trainer was',
         Point(y=315, x=373),
         Point(y=349, x=906),
         invert=True,
+        signature=True,
     ),
     match_text(
         'Communication ended due to an error.',
         Point(y=331, x=393),
         Point(y=368, x=884),
         invert=True,
+        signature=True,
     ),
 )
 
@@ -67,6 +76,7 @@ def to_raid_select(start: str, end: str) -> States:
         Point(y=535, x=122),
         Point(y=566, x=241),
         invert=True,
+        signature=True,
     )
 
     return {
@@ -107,6 +117,7 @@ def to_raid_select(start: str, end: str) -> States:
                     Point(y=12, x=75),
                     Point(y=42, x=374),
                     invert=True,
+                    signature=True,
                 ),
                 do(),
                 end,
@@ -115,16 +126,6 @@ def to_raid_select(start: str, end: str) -> States:
     }
 
 
-def _imgs(d: str) -> list[tuple[str, numpy.ndarray]]:
-    return [
-        (
-            os.path.splitext(f)[0],
-            cv2.imread(os.path.join(d, f), flags=cv2.IMREAD_UNCHANGED),
-        )
-        for f in os.listdir(d)
-    ]
-
-
 def _extract_type(
         im: numpy.ndarray,
         dims: tuple[int, int, int],
@@ -140,58 +141,61 @@ def _extract_type(
 
 
 @functools.lru_cache
-def _types(dims: tuple[int, int, int]) -> list[tuple[str, numpy.ndarray]]:
-    return [
-        (name, _extract_type(img, dims))
-        for name, img in _imgs(os.path.join(_HERE, 'types'))
-    ]
+def _types(dims: tuple[int, int, int]) -> TemplateIndex:
+    return TemplateIndex(
+        *load_templates(
+            os.path.join(_HERE, 'types'),
+            f'sv-types-{dims[1]}x{dims[0]}',
+            process=functools.partial(_extract_type, dims=dims),
+        ),
+    )
 
 
 def raid_type(frame: numpy.ndarray) -> str:
-    return _best(_extract_type(frame, frame.shape), _types(frame.shape))
+    return _types(frame.shape).best(_extract_type(frame, frame.shape))
 
 
-@functools.lru_cache
-def _sprites(size: tuple[int, int]) -> list[tuple[str, numpy.ndarray]]:
-    return [
-        (name, cv2.resize(img[:, :, 3], size))
-        for name, img in _imgs(os.path.join(_HERE, '../../sv-sprites'))
-    ]
+def _sprite_mask(img: numpy.ndarray, size: tuple[int, int]) -> numpy.ndarray:
+    return cv2.resize(img[:, :, 3], size)
 
 
 @functools.lru_cache
-def _select_stars() -> list[tuple[str, numpy.ndarray]]:
-    return _imgs(os.path.join(_HERE, 'select-stars'))
+def _sprites(size: tuple[int, int]) -> TemplateIndex:
+    return TemplateIndex(
+        *load_templates(
+            os.path.join(_HERE, '../../sv-sprites'),
+            f'sv-sprites-{size[0]}x{size[1]}',
+            flags=cv2.IMREAD_UNCHANGED,
+            process=functools.partial(_sprite_mask, size=size),
+        ),
+    )
 
 
 @functools.lru_cache
-def _large_stars() -> list[tuple[str, numpy.ndarray]]:
-    return _imgs(os.path.join(_HERE, 'large-stars'))
+def _select_stars() -> TemplateIndex:
+    return TemplateIndex(
+        *load_templates(
+            os.path.join(_HERE, 'select-stars'),
+            'sv-select-stars',
+        ),
+    )
 
 
-def _best(
-        crop: numpy.ndarray,
-        candidates: list[tuple[str, numpy.ndarray]],
-) -> str:
-    best_name = ''
-    best_diff = 1e9
-    for name, img in candidates:
-        diff = numpy.average(cv2.absdiff(crop, img))
-        if diff < best_diff:
-            best_name = name
-            best_diff = diff
-    return best_name
+@functools.lru_cache
+def _large_stars() -> TemplateIndex:
+    return TemplateIndex(
+        *load_templates(os.path.join(_HERE, 'large-stars'), 'sv-large-stars'),
+    )
 
 
 def large_star_count(frame: numpy.ndarray) -> str:
     tl_stars = Point(y=399, x=706)
     br_stars = Point(y=453, x=1055)
     crop = frame[tl_stars.y:br_stars.y, tl_stars.x:br_stars.x]
-    return _best(crop, _large_stars()).split('-')[0]
+    return _large_stars().best(crop).split('-')[0]
 
 
-def _poke_mask(crop: numpy.ndarray) -> numpy.ndarray:
-    hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+def _poke_mask(hsv: numpy.ndarray) -> numpy.ndarray:
     mask = cv2.inRange(hsv, (100, 80, 55), (125, 160, 80))
     kernel = numpy.ones((3, 3), numpy.uint8)
     return cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
@@ -206,7 +210,7 @@ def select_pokemon(frame: numpy.ndarray) -> list[list[str | None]]:
     )(frame):
         return [[None] * 4, [None] * 4]
 
-    mask = _poke_mask(frame)
+    mask = _poke_mask(to_hsv(frame))
 
     ret: list[list[str | None]] = [[], []]
 
@@ -224,15 +228,16 @@ def select_pokemon(frame: numpy.ndarray) -> list[list[str | None]]:
             if numpy.count_nonzero(poke_crop) == 0:
                 ret[p_y].append(None)
             else:
-                star = _best(star_crop, _select_stars())
-                poke = _best(poke_crop, _sprites((120, 120)))
+                star = _select_stars().best(star_crop)
+                poke = _sprites((120, 120)).best(poke_crop)
                 ret[p_y].append(f'{star} {poke}')
 
     return ret
 
 
 def raid_pokemon(frame: numpy.ndarray) -> str:
-    return _best(_poke_mask(frame[145:380, 763:998]), _sprites((235, 235)))
+    hsv = to_hsv(frame, Point(y=145, x=763), Point(y=380, x=998))
+    return _sprites((235, 235)).best(_poke_mask(hsv))
 
 
 def attack_position(frame: numpy.ndarray) -> int:
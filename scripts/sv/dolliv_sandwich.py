@@ -6,7 +6,6 @@ import os
 
 import cv2
 import numpy
-import serial
 
 from scripts.engine import all_match
 from scripts.engine import always_matches
@@ -20,6 +19,7 @@ from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
 from scripts.engine import Timeout
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.sv._bootup import bootup
 from scripts.switch import alarm
@@ -218,7 +218,7 @@ def main() -> int:
         **alarm('ALARM', quiet=args.quiet),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
@@ -3,8 +3,6 @@ from __future__ import annotations
 import argparse
 import time
 
-import serial
-
 from scripts.engine import all_match
 from scripts.engine import always_matches
 from scripts.engine import any_match
@@ -17,6 +15,7 @@ from scripts.engine import match_text
 from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.sv._bootup import world
 from scripts.switch import SERIAL_DEFAULT
@@ -211,7 +210,7 @@ def main() -> int:
         ),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
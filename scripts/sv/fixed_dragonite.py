@@ -6,7 +6,6 @@ import time
 
 import cv2
 import numpy
-import serial
 
 from scripts.engine import always_matches
 from scripts.engine import do
@@ -15,6 +14,7 @@ from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.sv._bootup import bootup
 from scripts.switch import alarm
@@ -81,7 +81,7 @@ def main() -> int:
         **alarm('ALARM', quiet=args.quiet),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
@@ -18,6 +18,7 @@ from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.engine import Write
 from scripts.sv._bootup import world
@@ -230,7 +231,7 @@ def main() -> int:
         **move_box('DEPOSIT_NEXT_BOX', 'PICKUP_TO_COLUMN', 'R'),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
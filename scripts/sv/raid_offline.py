@@ -19,6 +19,7 @@ from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.sv._bootup import bootup
 from scripts.sv._bootup import world
@@ -296,7 +297,7 @@ def main() -> int:
         **alarm('ALARM', quiet=False),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
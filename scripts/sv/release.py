@@ -12,6 +12,7 @@ from scripts.engine import make_vid
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.sv._move_box import move_box
 from scripts.sv._to_boxes import to_boxes
@@ -66,7 +67,7 @@ def main() -> int:
         **move_box('NEXT_BOX', 'RELEASE_BOX', 'R'),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
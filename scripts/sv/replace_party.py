@@ -2,8 +2,6 @@ from __future__ import annotations
 
 import argparse
 
-import serial
-
 from scripts.engine import always_matches
 from scripts.engine import bye
 from scripts.engine import Color
@@ -15,6 +13,7 @@ from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.sv._bootup import world
 from scripts.sv._move_box import move_box
@@ -107,7 +106,7 @@ def main() -> int:
         ),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
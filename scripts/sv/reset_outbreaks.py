@@ -4,7 +4,6 @@ import argparse
 
 import cv2
 import numpy
-import serial
 
 from scripts.engine import do
 from scripts.engine import make_vid
@@ -14,6 +13,7 @@ from scripts.engine import Press
 from scripts.engine import request_box
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.sv._skip_day import skip_day
 from scripts.switch import SERIAL_DEFAULT
@@ -113,7 +113,7 @@ def main() -> int:
         'CONFIRM': ((check, do(), 'INITIAL'),),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=vid, ser=ser, initial='INITIAL', states=states)
 
 
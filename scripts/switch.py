@@ -5,6 +5,7 @@ import datetime
 import sys
 import time
 from typing import Literal
+from typing import NamedTuple
 
 import cv2
 import numpy
@@ -17,18 +18,21 @@ from scripts.engine import bye
 from scripts.engine import Color
 from scripts.engine import do
 from scripts.engine import get_text
+from scripts.engine import macro
 from scripts.engine import make_vid
 from scripts.engine import match_px
 from scripts.engine import match_text
 from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
+from scripts.engine import scheduler
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 
 SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
 
-reset = do(Press('H'), Wait(1), Press('X'), Wait(.5), Press('A'), Wait(3))
+reset = macro(Press('H'), Wait(1), Press('X'), Wait(.5), Press('A'), Wait(3))
 
 game_start = all_match(
     match_px(Point(y=61, x=745), Color(b=217, g=217, r=217)),
@@ -37,6 +41,7 @@ game_start = all_match(
         Point(y=669, x=1158),
         Point(y=700, x=1228),
         invert=False,
+        signature=True,
     ),
 )
 
@@ -49,6 +54,7 @@ class GameCrash:
             Point(y=307, x=306),
             Point(y=351, x=971),
             invert=True,
+            signature=True,
         )
 
     def record(self, vid: object, ser: object) -> None:
@@ -72,12 +78,119 @@ def stick(
 ) -> Action:
     def stick_impl(vid: cv2.VideoCapture, ser: serial.Serial) -> None:
         print(f'{s=} {x=} {y=} {duration=}')
-        ser.write(bytes([ord(s), x, y]))
-        time.sleep(duration)
-        ser.write(b'.')
+        scheduler(ser).write(bytes([ord(s), x, y]), duration)
+        scheduler(ser).write(b'.')
     return stick_impl
 
 
+BUTTONS = {
+    'Y': 0x01,
+    'B': 0x02,
+    'A': 0x04,
+    'X': 0x08,
+    'L': 0x10,
+    'R': 0x20,
+    'ZL': 0x40,
+    'ZR': 0x80,
+    'MINUS': 0x100,
+    'PLUS': 0x200,
+    'LCLICK': 0x400,
+    'RCLICK': 0x800,
+    'HOME': 0x1000,
+    'CAPTURE': 0x2000,
+}
+DPAD = {
+    'TOP': 0,
+    'TOP_RIGHT': 1,
+    'RIGHT': 2,
+    'BOTTOM_RIGHT': 3,
+    'BOTTOM': 4,
+    'BOTTOM_LEFT': 5,
+    'LEFT': 6,
+    'TOP_LEFT': 7,
+    'CENTER': 8,
+}
+
+
+class State(NamedTuple):
+    buttons: frozenset[str] = frozenset()
+    dpad: str = 'CENTER'
+    lx: int = STICK_0
+    ly: int = STICK_0
+    rx: int = STICK_0
+    ry: int = STICK_0
+
+    def encode(self) -> bytes:
+        button = sum(BUTTONS[b] for b in self.buttons)
+        return b'S' + bytes((
+            button & 0xff, button >> 8,
+            DPAD[self.dpad],
+            self.lx, self.ly, self.rx, self.ry,
+        ))
+
+
+class Controller:
+    """send whole controller states (several buttons and both sticks)
+
+    a state is only written if it differs from the last queued input.  this
+    requires firmware which supports the 'S' command.  that firmware also
+    speaks the framed protocol, so a port which did not negotiate it (see
+    `Transport`) is refused: most states have no single character equivalent.
+    """
+
+    def __init__(self, ser: serial.Serial) -> None:
+        if not isinstance(ser, Transport) or not ser.framed:
+            raise ValueError(
+                'setting controller states requires the framed protocol '
+                '(update the firmware in hw/switch)',
+            )
+        self.ser = ser
+
+    def set_state(
+            self,
+            *buttons: str,
+            dpad: str = 'CENTER',
+            lx: int = STICK_0,
+            ly: int = STICK_0,
+            rx: int = STICK_0,
+            ry: int = STICK_0,
+            duration: float = 0.,
+    ) -> None:
+        unknown = set(buttons) - BUTTONS.keys()
+        if unknown:
+            raise ValueError(f'unknown buttons: {sorted(unknown)}')
+        elif dpad not in DPAD:
+            raise ValueError(f'unknown dpad: {dpad}')
+
+        state = State(frozenset(buttons), dpad, lx, ly, rx, ry)
+        encoded = state.encode()
+        sched = scheduler(self.ser)
+        if sched.last != encoded:
+            sched.write(encoded)
+        sched.delay(duration)
+
+    def release(self) -> None:
+        self.set_state()
+
+    def hold(
+            self,
+            *buttons: str,
+            duration: float,
+            dpad: str = 'CENTER',
+            lx: int = STICK_0,
+            ly: int = STICK_0,
+            rx: int = STICK_0,
+            ry: int = STICK_0,
+    ) -> None:
+        """hold the state for `duration` and then release everything"""
+        self.set_state(
+            *buttons,
+            dpad=dpad, lx=lx, ly=ly, rx=rx, ry=ry,
+            duration=duration,
+        )
+        self.release()
+
+
 def alarm(name: str, *, quiet: bool) -> States:
     if quiet:
         return {
@@ -139,7 +252,7 @@ def clock(dt: datetime.datetime, name: str, end: str) -> States:
         name: (
             (
                 always_matches,
-                do(
+                macro(
                     Press('s'),
                     Press('d', duration=.55),
                     Press('A'), Wait(1),
@@ -197,6 +310,7 @@ def clock(dt: datetime.datetime, name: str, end: str) -> States:
                     Point(y=442, x=845),
                     Point(y=500, x=937),
                     invert=False,
+                    signature=True,
                 ),
                 do(Press('A'), Wait(.1), Press('A'), Wait(.5), Press('H')),
                 end,
@@ -221,7 +335,7 @@ def main() -> int:
             'END': ((always_matches, bye, 'UNREACHABLE'),),
         }
 
-        with serial.Serial(args.serial, 9600) as ser:
+        with Transport(args.serial) as ser:
             run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
     else:
         raise AssertionError(f'unreachable: {args.command=}')
@@ -7,19 +7,20 @@ import numpy
 from scripts.engine import always_matches
 from scripts.engine import do
 from scripts.engine import Point
+from scripts.engine import reads
+from scripts.engine import roi
 from scripts.engine import States
 
 
-def dialog(frame: numpy.ndarray) -> bool:
-    tl1 = Point(y=587, x=22).norm(frame.shape)
-    br1 = Point(y=604, x=40).norm(frame.shape)
+_DIALOG_LEFT = roi(Point(y=587, x=22), Point(y=604, x=40))
+_DIALOG_RIGHT = roi(Point(y=587, x=1183), Point(y=604, x=1200))
 
-    tl2 = Point(y=587, x=1183).norm(frame.shape)
-    br2 = Point(y=604, x=1200).norm(frame.shape)
 
-    return (
-        numpy.all(frame[tl1.y:br1.y, tl1.x:br1.x] == (48, 48, 48)) and
-        numpy.all(frame[tl2.y:br2.y, tl2.x:br2.x] == (59, 59, 59))
+@reads(_DIALOG_LEFT, _DIALOG_RIGHT)
+def dialog(frame: numpy.ndarray) -> bool:
+    return bool(
+        numpy.all(_DIALOG_LEFT(frame) == (48, 48, 48)) and
+        numpy.all(_DIALOG_RIGHT(frame) == (59, 59, 59)),
     )
 
 
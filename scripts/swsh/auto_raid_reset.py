@@ -9,6 +9,7 @@ import cv2
 import numpy
 import serial
 
+from scripts.engine import Transport
 from scripts.switch import SERIAL_DEFAULT
 
 
@@ -97,7 +98,7 @@ def main() -> int:
     vid.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
     vid.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         if args.date is not None:
             current_date = args.date
         else:
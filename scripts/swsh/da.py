@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import argparse
 import collections
-import functools
 import os.path
 import re
 
@@ -15,7 +14,9 @@ from scripts.engine import always_matches
 from scripts.engine import any_match
 from scripts.engine import Color
 from scripts.engine import do
+from scripts.engine import find_template
 from scripts.engine import get_text
+from scripts.engine import get_texts
 from scripts.engine import getframe
 from scripts.engine import make_vid
 from scripts.engine import match_px
@@ -24,6 +25,7 @@ from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.switch import alarm
 from scripts.switch import reset
@@ -39,12 +41,9 @@ TYPES = frozenset((
 ))
 
 
-@functools.lru_cache(maxsize=1)
-def _arrow_mask() -> tuple[numpy.ndarray, numpy.ndarray]:
-    here = os.path.dirname(__file__)
-    tmpl = cv2.imread(os.path.join(here, 'templates', 'move_arrow.png'))
-    mask = 255 - cv2.inRange(tmpl, tmpl[0][0], tmpl[0][0])
-    return tmpl, mask
+MOVE_ARROW = os.path.join(
+    os.path.dirname(__file__), 'templates', 'move_arrow.png',
+)
 
 
 def get_int(
@@ -55,7 +54,10 @@ def get_int(
         invert: bool,
         default: int,
 ) -> int:
-    s = get_text(frame, tl, br, invert=invert)
+    return parse_int(get_text(frame, tl, br, invert=invert), default=default)
+
+
+def parse_int(s: str, *, default: int) -> int:
     # sometimes this text has garbage on it
     match = re.search(r'\d+', s)
     if match is not None:
@@ -120,7 +122,7 @@ def main() -> int:
         chosen_pokemon = 0
         max_stat = -1
 
-        for i, ((pok_tl, pok_br), locs) in enumerate((
+        pokemon = (
             (
                 (Point(y=209, x=623), Point(y=235, x=748)),
                 (
@@ -142,15 +144,23 @@ def main() -> int:
                     (Point(y=551, x=972), Point(y=578, x=1023)),
                 ),
             ),
-        )):
-            name = get_text(frame, pok_tl, pok_br, invert=i == 0)
+        )
+
+        regions = []
+        for i, ((pok_tl, pok_br), locs) in enumerate(pokemon):
+            regions.append((pok_tl, pok_br, i == 0))
+            regions.extend((tl, br, False) for tl, br in locs)
+        texts = iter(get_texts(frame, regions))
+
+        for i, (_, locs) in enumerate(pokemon):
+            name = next(texts)
+            stats = [parse_int(next(texts), default=0) for _ in locs]
             print(f'pokemon({i}): {name}')
             if name in {'Unfezant', 'Whiscash', 'Mr. Mime', 'Lilligant'}:
                 print('=> skipping bad pokemon')
                 continue
 
-            for tl, br in locs:
-                stat = get_int(frame, tl, br, invert=False, default=0)
+            for stat in stats:
                 if stat > max_stat:
                     chosen_pokemon = i
                     max_stat = stat
@@ -236,11 +246,11 @@ def main() -> int:
     def best_move(vid: cv2.VideoCapture, ser: serial.Serial) -> None:
         frame = getframe(vid)
 
-        crop = frame[427:705, 813:893]
-        arrow, mask = _arrow_mask()
-        match = cv2.matchTemplate(crop, arrow, cv2.TM_CCOEFF_NORMED, mask=mask)
-        _, _, _, (_, arrow_y) = cv2.minMaxLoc(match)
-        current_move = int(arrow_y / len(crop) * 4)
+        tl, br = Point(y=427, x=813), Point(y=705, x=893)
+        (arrow_y, _), _, _ = find_template(
+            frame, MOVE_ARROW, tl, br, mask=True,
+        )
+        current_move = int((arrow_y - tl.y) / (br.y - tl.y) * 4)
 
         print(f'moving from {current_move=}')
         for _ in range(current_move):
@@ -738,7 +748,7 @@ def main() -> int:
         **alarm('ALARM', quiet=args.quiet),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
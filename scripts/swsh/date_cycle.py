@@ -7,6 +7,7 @@ import time
 
 import serial
 
+from scripts.engine import Transport
 from scripts.switch import SERIAL_DEFAULT
 
 
@@ -56,7 +57,7 @@ def main() -> int:
 
     current_date = args.date
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         while True:
             _press(ser, 'A')
             time.sleep(4)
@@ -3,8 +3,6 @@ from __future__ import annotations
 import argparse
 import time
 
-import serial
-
 from scripts.engine import Action
 from scripts.engine import always_matches
 from scripts.engine import do
@@ -12,6 +10,7 @@ from scripts.engine import make_vid
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.switch import alarm
 from scripts.switch import reset
@@ -74,7 +73,7 @@ def main() -> int:
         **alarm('ALARM', quiet=args.quiet),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
@@ -4,7 +4,6 @@ import argparse
 import time
 
 import numpy
-import serial
 
 from scripts.engine import all_match
 from scripts.engine import always_matches
@@ -17,6 +16,7 @@ from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.switch import reset
 from scripts.switch import SERIAL_DEFAULT
@@ -116,7 +116,7 @@ def main() -> int:
         ),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
@@ -18,7 +18,9 @@ from scripts.engine import match_text
 from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
+from scripts.engine import scheduler
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.engine import Write
 from scripts.switch import alarm
@@ -45,8 +47,10 @@ class Mover:
             self.todo.extend((s, .4) for s in 'ws')
             move, t = self.todo.popleft()
 
-        ser.write(move.encode())
-        self._t = time.monotonic() + t
+        # after any input still queued, which would otherwise replace it
+        sched = scheduler(ser)
+        sched.write(move.encode())
+        self._t = sched.tail + t
 
     def reroute(self, moves: list[tuple[str, float]]) -> None:
         print(f'reroute! {moves}')
@@ -138,7 +142,7 @@ def main() -> int:
         **alarm('ALARM', quiet=args.quiet),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
@@ -5,6 +5,7 @@ import time
 
 import serial
 
+from scripts.engine import Transport
 from scripts.switch import SERIAL_DEFAULT
 
 
@@ -27,7 +28,7 @@ def main() -> int:
     parser.add_argument('--serial', default=SERIAL_DEFAULT)
     args = parser.parse_args()
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         for i in range(args.count):
             print(f'reviving ~#{i + 1}')
 
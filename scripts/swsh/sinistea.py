@@ -9,6 +9,7 @@ import cv2
 import numpy
 import serial
 
+from scripts.engine import Transport
 from scripts.switch import SERIAL_DEFAULT
 
 
@@ -109,7 +110,7 @@ def main() -> int:
     vid.set(cv2.CAP_PROP_FRAME_WIDTH, 768)
     vid.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
 
-    with serial.Serial(args.serial, 9600) as ser, _shh(ser):
+    with Transport(args.serial) as ser, _shh(ser):
         while True:
             # TODO: auto-detect the "game has been interrupted" screen
             # _await_not_pixel(ser, vid, x=5, y=5, pixel=(16, 16, 16))
@@ -3,8 +3,6 @@ from __future__ import annotations
 import argparse
 import datetime
 
-import serial
-
 from scripts.engine import always_matches
 from scripts.engine import bye
 from scripts.engine import do
@@ -12,6 +10,7 @@ from scripts.engine import make_vid
 from scripts.engine import Press
 from scripts.engine import run
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.engine import Wait
 from scripts.switch import SERIAL_DEFAULT
 from scripts.swsh._bootup import bootup
@@ -52,7 +51,7 @@ def main() -> int:
         **skipper.skip('SKIP1', 'COUNTER'),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
 
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import glob
+import hashlib
+import os.path
+import re
+import tempfile
+from collections.abc import Callable
+from collections.abc import Sequence
+
+import cv2
+import numpy
+
+TEMPLATE_CACHE = os.environ.get(
+    'TEMPLATE_CACHE',
+    os.path.join(
+        os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+        'nintendo-microcontrollers',
+    ),
+)
+_VERSION = 1
+
+
+def _read(path: str, flags: int) -> numpy.ndarray:
+    img = cv2.imread(path, flags=flags)
+    if img is None:
+        raise ValueError(f'could not read {path}')
+    return img
+
+
+def _stacked(
+        paths: Sequence[str],
+        key: str,
+        *,
+        flags: int,
+        process: Callable[[numpy.ndarray], numpy.ndarray] | None,
+) -> numpy.ndarray:
+    def _load() -> numpy.ndarray:
+        imgs = [_read(path, flags) for path in paths]
+        if process is not None:
+            imgs = [process(img) for img in imgs]
+        return numpy.stack(imgs)
+
+    if not TEMPLATE_CACHE:
+        return _load()
+
+    h = hashlib.sha256(f'{_VERSION}\0{key}\0{flags}\0'.encode())
+    for path in paths:
+        st = os.stat(path)
+        h.update(f'{os.path.abspath(path)}\0{st.st_mtime_ns}\0'.encode())
+        h.update(f'{st.st_size}\0'.encode())
+    prefix = os.path.join(TEMPLATE_CACHE, re.sub(r'[^\w.-]', '_', key))
+    cached = f'{prefix}-{h.hexdigest()[:16]}.npy'
+
+    try:
+        return numpy.load(cached, mmap_mode='r')
+    except OSError:
+        pass
+
+    imgs = _load()
+    os.makedirs(TEMPLATE_CACHE, exist_ok=True)
+    # only this key's caches (not those of a key which extends it)
+    digest = '[0-9a-f]' * 16
+    for stale in glob.glob(f'{glob.escape(prefix)}-{digest}.npy'):
+        if stale == cached:  # another process just built it
+            continue
+        try:
+            os.remove(stale)
+        except FileNotFoundError:  # another process removed it first
+            pass
+    fd, tmp = tempfile.mkstemp(dir=TEMPLATE_CACHE, suffix='.tmp')
+    with open(fd, 'wb') as f:
+        numpy.save(f, imgs)
+    os.replace(tmp, cached)
+    try:
+        return numpy.load(cached, mmap_mode='r')
+    except OSError:  # removed by a process which saw other templates
+        return imgs
+
+
+def load_templates(
+        directory: str,
+        key: str,
+        *,
+        flags: int = cv2.IMREAD_COLOR,
+        process: Callable[[numpy.ndarray], numpy.ndarray] | None = None,
+) -> tuple[tuple[str, ...], numpy.ndarray]:
+    """the names and (stacked) images of every image in `directory`
+
+    the images (after `process`, they must all have the same shape) are
+    cached in TEMPLATE_CACHE keyed by `key` and the modification time of
+    every file and loaded memory-mapped, so processes share them.  `key`
+    must change when `process` does.  TEMPLATE_CACHE= disables the cache.
+    """
+    filenames = sorted(os.listdir(directory))
+    names = tuple(os.path.splitext(filename)[0] for filename in filenames)
+    paths = [os.path.join(directory, filename) for filename in filenames]
+    return names, _stacked(paths, key, flags=flags, process=process)
+
+
+def load_template(
+        path: str,
+        key: str,
+        *,
+        flags: int = cv2.IMREAD_COLOR,
+        process: Callable[[numpy.ndarray], numpy.ndarray] | None = None,
+) -> numpy.ndarray:
+    """a single image, cached like `load_templates`"""
+    imgs = _stacked([path], key, flags=flags, process=process)
+    return imgs[0]
+
+
+def _blocks(imgs: numpy.ndarray, block: int) -> numpy.ndarray:
+    """sums of `block` x `block` pixel blocks, flattened per image"""
+    n, h, w = imgs.shape[:3]
+    h, w = h // block * block, w // block * block
+    imgs = imgs[:, :h, :w].astype(numpy.int32)
+    shape = (n, h // block, block, w // block, block, *imgs.shape[3:])
+    return imgs.reshape(shape).sum(axis=(2, 4)).reshape(n, -1)
+
+
+class TemplateIndex:
+    """finds the templates closest to an image (by mean absolute difference)
+
+    `imgs` are the templates stacked into one array (as returned by
+    `load_templates`), each must have the same shape as the images looked up.
+    the templates are first compared on sums of `block` x `block` pixel
+    blocks: the difference of the block sums is never more than the difference
+    of the pixels so only the candidates which could still win are compared
+    exactly.
+    """
+
+    def __init__(
+            self,
+            names: Sequence[str],
+            imgs: numpy.ndarray,
+            *,
+            block: int = 4,
+    ) -> None:
+        if not names:
+            raise ValueError('no templates')
+        elif len(names) != len(imgs):
+            raise ValueError(f'{len(names)} names for {len(imgs)} images')
+        self.names = tuple(names)
+        self.imgs = imgs
+        self.shape = self.imgs.shape[1:]
+        self.block = block
+        self._coarse = _blocks(self.imgs, block)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _check(self, img: numpy.ndarray) -> None:
+        if img.shape != self.shape:
+            raise ValueError(f'expected shape {self.shape}, got {img.shape}')
+
+    def _diff(self, img: numpy.ndarray, idx: numpy.ndarray) -> numpy.ndarray:
+        diff = self.imgs[idx].astype(numpy.int16) - img.astype(numpy.int16)
+        return numpy.abs(diff).reshape(len(idx), -1).sum(axis=1)
+
+    def scores(self, img: numpy.ndarray) -> numpy.ndarray:
+        """the mean absolute difference to every template"""
+        self._check(img)
+        return self._diff(img, numpy.arange(len(self))) / img.size
+
+    def top(self, img: numpy.ndarray, k: int = 1) -> list[tuple[str, float]]:
+        """the `k` closest templates (and their scores), closest first"""
+        self._check(img)
+        k = min(k, len(self))
+        coarse = numpy.abs(
+            self._coarse - _blocks(img[numpy.newaxis], self.block),
+        ).sum(axis=1)
+        order = numpy.argsort(coarse, kind='stable')
+
+        batch = max(k, 16)
+        found: list[tuple[float, int]] = []
+        for start in range(0, len(order), batch):
+            idx = order[start:start + batch]
+            if len(found) == k and coarse[idx[0]] > found[-1][0]:
+                break
+            found.extend(zip(self._diff(img, idx).tolist(), idx.tolist()))
+            found.sort()
+            del found[k:]
+
+        return [(self.names[i], diff / img.size) for diff, i in found]
+
+    def best(self, img: numpy.ndarray) -> str:
+        (name, _), = self.top(img)
+        return name
+
+    def match(
+            self,
+            img: numpy.ndarray,
+            *,
+            max_score: float,
+            margin: float,
+    ) -> str | None:
+        """the closest template, None unless its score is at most `max_score`
+        and the next closest template's is at least `margin` more
+        """
+        (name, score), *rest = self.top(img, 2)
+        if score > max_score:
+            return None
+        elif rest and rest[0][1] - score < margin:
+            return None
+        else:
+            return name
+
+
+def dhash(img: numpy.ndarray) -> int:
+    """64 bit difference hash (insensitive to scale, brightness and noise)"""
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(img, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = numpy.packbits(small[:, 1:] > small[:, :-1])
+    return int.from_bytes(bits.tobytes(), 'big')
+
+
+class HashIndex:
+    """looks up copies of templates by their `dhash`
+
+    the hash only narrows the candidates to the templates within
+    `max_distance` differing bits (tolerating e.g. a colour shift of the
+    capture card): similar templates can be only a few bits apart, so the
+    candidates are always compared by mean absolute difference.  the closest
+    must score at most `max_score` and `margin` less than the next candidate,
+    otherwise nothing matches.
+    """
+
+    def __init__(
+            self,
+            names: Sequence[str],
+            imgs: numpy.ndarray,
+            *,
+            max_distance: int = 8,
+            max_score: float = 32,
+            margin: float = .5,
+    ) -> None:
+        if not names:
+            raise ValueError('no templates')
+        elif len(names) != len(imgs):
+            raise ValueError(f'{len(names)} names for {len(imgs)} images')
+        self.names = tuple(names)
+        self.imgs = imgs
+        self.max_distance = max_distance
+        self.max_score = max_score
+        self.margin = margin
+        self.hashes = tuple(dhash(img) for img in imgs)
+
+    def lookup(self, img: numpy.ndarray) -> str | None:
+        """the matching template's name, None if nothing is close enough"""
+        img_hash = dhash(img)
+        idx = [
+            i
+            for i, other in enumerate(self.hashes)
+            if bin(img_hash ^ other).count('1') <= self.max_distance
+        ]
+        if not idx:
+            return None
+
+        if img.shape != self.imgs.shape[1:]:
+            h, w = self.imgs.shape[1:3]
+            img = cv2.resize(img, (w, h))
+        diff = self.imgs[idx].astype(numpy.int16) - img.astype(numpy.int16)
+        scores = numpy.abs(diff).reshape(len(idx), -1).mean(axis=1)
+        order = numpy.argsort(scores, kind='stable')
+        best = scores[order[0]]
+        if best > self.max_score:
+            return None
+        elif len(idx) > 1 and scores[order[1]] - best < self.margin:
+            return None
+        else:
+            return self.names[idx[order[0]]]
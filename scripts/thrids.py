@@ -1,19 +1,25 @@
 from __future__ import annotations
 
 import argparse
+from collections.abc import Sequence
 from typing import NamedTuple
 
 import cv2
 import numpy
 import serial
 
+from scripts.engine import Action
 from scripts.engine import always_matches
 from scripts.engine import do
 from scripts.engine import Matcher
 from scripts.engine import Point
 from scripts.engine import Press
+from scripts.engine import reads
+from scripts.engine import roi
+from scripts.engine import scheduler
 from scripts.engine import States
 from scripts.engine import tess_text_u8
+from scripts.engine import to_hsv
 from scripts.engine import Wait
 
 SERIAL_DEFAULT = '/dev/ttyACM0'
@@ -28,12 +34,9 @@ def region_colorish(
         *,
         quiet: bool = True,
 ) -> Matcher:
+    @reads(roi(top_left, bottom_right))
     def region_colorish_impl(frame: numpy.ndarray) -> bool:
-        tl = top_left.norm(frame.shape)
-        br = bottom_right.norm(frame.shape)
-
-        crop = frame[tl.y:br.y, tl.x:br.x]
-        hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+        hsv = to_hsv(frame, top_left, bottom_right)
         mask = cv2.inRange(hsv, hsv_low, hsv_high)
         got_ratio = numpy.count_nonzero(mask) / mask.size
         if not quiet and got_ratio >= .001:
@@ -89,7 +92,7 @@ def touch(ser: serial.Serial, *, x: int, y: int) -> None:
         _POS | 0 | 0 | (_MASK & y),
         *b't',
     ])
-    ser.write(bts)
+    scheduler(ser).write(bts)
 
 
 class Touch(NamedTuple):
@@ -100,6 +103,87 @@ class Touch(NamedTuple):
         touch(ser, x=self.x, y=self.y)
 
 
+_PATH_LIFT = 0xff
+_PATH_MAX_MS = 0xffff
+_PATH_MAX_POINTS = 64  # PATH_MAX_POINTS of the firmware
+_BAUD = 9600
+
+
+def touch_path(
+        ser: serial.Serial,
+        points: Sequence[tuple[int, int, float] | float],
+) -> None:
+    """touch each (x, y, seconds) in turn without lifting in between
+
+    a bare number of seconds lifts for that long instead.  the firmware reads
+    the whole path before playing it, at most `_PATH_MAX_POINTS` points.
+    """
+    bts = bytearray()
+    n = 0
+    total = 0
+    for point in points:
+        if isinstance(point, tuple):
+            x, y, s = point
+            assert 0 <= x < 320 and 0 <= y < 240, (x, y)
+            x_high, x_low, y_b = x >> 8, x & 0xff, y
+        else:
+            s = point
+            x_high, x_low, y_b = _PATH_LIFT, 0, 0
+        ms = round(s * 1000)
+        assert 0 <= ms <= _PATH_MAX_MS, s
+        bts.extend((x_high, x_low, y_b, ms & 0xff, ms >> 8))
+        n += 1
+        total += ms
+    assert 0 < n <= _PATH_MAX_POINTS, n
+
+    packet = bytes((ord('p'), n)) + bts
+    # 10 bits per byte (with start and stop bits) on the wire
+    wire = len(packet) * 10 / _BAUD
+    print(f'touch_path({n} points, {total}ms)')
+    scheduler(ser).write(packet, wire + total / 1000)
+
+
+class TouchPath(NamedTuple):
+    points: tuple[tuple[int, int, float] | float, ...]
+
+    def __call__(self, vid: object, ser: serial.Serial) -> None:
+        touch_path(ser, self.points)
+
+
+class Swipe(NamedTuple):
+    start: tuple[int, int]
+    end: tuple[int, int]
+    duration: float = .3
+    steps: int = 10
+
+    def __call__(self, vid: object, ser: serial.Serial) -> None:
+        (x0, y0), (x1, y1) = self.start, self.end
+        dt = self.duration / (self.steps + 1)
+        points = tuple(
+            (
+                round(x0 + (x1 - x0) * i / self.steps),
+                round(y0 + (y1 - y0) * i / self.steps),
+                dt,
+            )
+            for i in range(self.steps + 1)
+        )
+        touch_path(ser, points)
+
+
+def taps(
+        *points: tuple[int, int],
+        hold: float = .1,
+        gap: float = .1,
+) -> Action:
+    """tap each (x, y) in turn as a single path"""
+    path: list[tuple[int, int, float] | float] = []
+    for x, y in points:
+        if path:
+            path.append(gap)
+        path.append((x, y, hold))
+    return TouchPath(tuple(path))
+
+
 def main() -> int:
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers(dest='command', required=True)
@@ -108,11 +192,29 @@ def main() -> int:
     touch_parser.add_argument('--serial', default=SERIAL_DEFAULT)
     touch_parser.add_argument('x', type=int)
     touch_parser.add_argument('y', type=int)
+
+    swipe_parser = subparsers.add_parser('swipe')
+    swipe_parser.add_argument('--serial', default=SERIAL_DEFAULT)
+    swipe_parser.add_argument('--duration', type=float, default=.3)
+    swipe_parser.add_argument('x0', type=int)
+    swipe_parser.add_argument('y0', type=int)
+    swipe_parser.add_argument('x1', type=int)
+    swipe_parser.add_argument('y1', type=int)
     args = parser.parse_args()
 
     if args.command == 'touch':
         with serial.Serial(args.serial, 9600) as ser:
             touch(ser, x=args.x, y=args.y)
+            scheduler(ser).wait()
+    elif args.command == 'swipe':
+        with serial.Serial(args.serial, 9600) as ser:
+            swipe = Swipe(
+                (args.x0, args.y0),
+                (args.x1, args.y1),
+                duration=args.duration,
+            )
+            swipe(None, ser)
+            scheduler(ser).wait()
     else:
         raise AssertionError(f'unreachable: {args.command=}')
     return 0
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 import argparse
-import time
-
-import serial
 
+from scripts.engine import scheduler
+from scripts.engine import Transport
+from scripts.switch import Controller
 from scripts.switch import SERIAL_DEFAULT
 
 
@@ -13,14 +13,24 @@ def main() -> int:
     parser.add_argument('--serial', default=SERIAL_DEFAULT)
     args = parser.parse_args()
 
-    with serial.Serial(args.serial, 9600) as ser:
-        while True:
-            ser.write(b'l')
-            time.sleep(.2)
-            ser.write(b'A')
-            time.sleep(.1)
-            ser.write(b'.')
-            time.sleep(.05)
+    ser = Transport(args.serial)
+    with ser:
+        sched = scheduler(ser)
+        if ser.framed:
+            controller = Controller(ser)
+            while True:
+                # keep the target locked with ZL while attacking
+                controller.set_state('ZL', duration=.2)
+                controller.set_state('ZL', 'A', duration=.1)
+                controller.set_state(duration=.05)
+                sched.wait()
+        else:
+            # older firmware holds a single button at a time
+            while True:
+                sched.write(b'l', .2)
+                sched.write(b'A', .1)
+                sched.write(b'.', .05)
+                sched.wait()
     return 0
 
 
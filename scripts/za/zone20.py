@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import argparse
-import time
 
 import serial
 
@@ -12,7 +11,9 @@ from scripts.engine import make_vid
 from scripts.engine import Point
 from scripts.engine import Press
 from scripts.engine import run
+from scripts.engine import scheduler
 from scripts.engine import States
+from scripts.engine import Transport
 from scripts.switch import SERIAL_DEFAULT
 from scripts.thrids import region_colorish
 
@@ -33,10 +34,7 @@ def main() -> int:
     def press(s: str) -> Action:
         def press_impl(vid: object, ser: serial.Serial) -> None:
             print(s, end='', flush=True)
-            ser.write(s.encode())
-            time.sleep(.1)
-            ser.write(b'.')
-            time.sleep(.05)
+            scheduler(ser).press(s.encode(), .1, release=b'.', gap=.05)
         return press_impl
 
     def nl(vid: object, ser: object) -> None:
@@ -60,7 +58,7 @@ def main() -> int:
         ),
     }
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with Transport(args.serial) as ser:
         run(vid=make_vid(), ser=ser, initial='INITIAL', states=states)
 
     return 0
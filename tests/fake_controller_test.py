@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from scripts.engine import Transport
+from scripts.fake_controller import FakeController
+
+
+def _wait_for(f):
+    end = time.monotonic() + 1
+    while not f():
+        if time.monotonic() > end:
+            raise AssertionError('timed out')
+        time.sleep(.01)
+
+
+@pytest.fixture
+def controller():
+    with FakeController() as controller:
+        yield controller
+
+
+def test_framed(controller):
+    ser = Transport(controller.port)
+    with ser:
+        assert ser.framed
+        ser.write(b'A')
+        _wait_for(lambda: controller.commands)
+    assert [cmd.c for cmd in controller.commands] == ['A']
+
+
+def test_reconnect_runs_first_command(controller):
+    with Transport(controller.port):
+        pass
+    _wait_for(lambda: not controller.framed)
+
+    ser = Transport(controller.port)
+    with ser:
+        assert ser.framed
+        ser.write(b'A')
+        _wait_for(lambda: controller.commands)
+    assert [cmd.c for cmd in controller.commands] == ['A']
+
+
+def test_no_recover_when_opted_out(controller):
+    old = Transport(controller.port)
+    old.framed = False
+    old.close()
+
+    ser = Transport(controller.port, recover=False)
+    with ser:
+        assert not ser.framed
+
+
+def test_reconnect_while_framed(controller):
+    old = Transport(controller.port)
+    old.write(b'A')
+    _wait_for(lambda: controller.commands)
+    # as if the host went away without returning to the legacy protocol
+    old.framed = False
+    old.close()
+
+    ser = Transport(controller.port)
+    with ser:
+        assert ser.framed
+        ser.write(b'B')
+        _wait_for(lambda: len(controller.commands) == 2)
+    assert [cmd.c for cmd in controller.commands] == ['A', 'B']
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from scripts import engine
+from scripts.engine import do
+from scripts.engine import Press
+from scripts.engine import Scheduler
+from scripts.engine import scheduler
+
+
+class FakeSerial:
+    def __init__(self):
+        self.writes = []
+        self.error = None
+
+    def write(self, bts):
+        if self.error is not None:
+            raise self.error
+        self.writes.append((time.monotonic(), bts))
+        return len(bts)
+
+    @property
+    def data(self):
+        return [bts for _, bts in self.writes]
+
+
+class FakeVid:
+    def read(self):
+        time.sleep(.001)
+        return True, None
+
+
+@pytest.fixture(autouse=True)
+def no_show(monkeypatch):
+    monkeypatch.setattr(engine, 'SHOW', False)
+
+
+@pytest.fixture
+def ser():
+    return FakeSerial()
+
+
+@pytest.fixture
+def vid():
+    return FakeVid()
+
+
+def test_writes_in_order_and_holds(ser):
+    sched = Scheduler(ser)
+    t0 = time.monotonic()
+    sched.press(b'A', .05, gap=.05)
+    sched.write(b'B')
+    sched.wait()
+
+    assert ser.data == [b'A', b'0', b'B']
+    (_, _), (t_release, _), (t_b, _) = ser.writes
+    assert t_release - t0 >= .05
+    assert t_b - t0 >= .1
+
+
+def test_wait_waits_for_a_write_without_duration(ser):
+    sched = Scheduler(ser)
+    sched.write(b'A')
+    sched.wait()
+    assert ser.data == [b'A']
+
+
+def test_cancel_drops_queued_input_and_releases(ser):
+    sched = Scheduler(ser)
+    sched.press(b'A', 5, release=b'.')
+    sched.write(b'B')
+    while not ser.writes:
+        time.sleep(.001)
+
+    sched.cancel()
+    assert not sched.busy()
+    sched.wait()
+    assert ser.data == [b'A', b'.']
+
+
+def test_write_error_is_raised_by_the_next_call(ser):
+    ser.error = OSError('unplugged')
+    sched = Scheduler(ser)
+    sched.press(b'A', .01)
+    with pytest.raises(OSError, match='unplugged'):
+        sched.wait()
+
+    ser.error = None
+    sched.write(b'B')
+    sched.wait()
+    assert ser.data == [b'B']
+
+
+def test_do_sends_input_before_other_actions(ser, vid):
+    seen = []
+    action = do(
+        Press('A', duration=.05),
+        lambda vid, ser: seen.append(list(ser.data)),
+    )
+    action(vid, ser)
+    assert seen == [[b'A', b'0']]
+
+
+def test_do_returns_while_trailing_input_is_sent(ser, vid):
+    do(Press('A', duration=5))(vid, ser)
+    assert scheduler(ser).busy()
+    scheduler(ser).cancel()
+    assert ser.data[-1] == b'0'